@@ -0,0 +1,136 @@
+import sys
+import json
+import argparse
+from glob import glob
+from multiprocessing import Pool, cpu_count
+from timeit import default_timer
+from models import registry
+from pipeline import stream_text
+from tiles import tiled_text
+from instrument import Instruments
+
+def workers_count(value):
+    """
+    argparse type of --workers: a positive number of processes, or -1 for one per CPU.
+    """
+    workers = int(value)
+    if workers < 1 and workers != -1:
+        raise argparse.ArgumentTypeError('the number of workers must be positive or -1, got {}'.format(value))
+    return workers
+
+#######################################################################################################################
+
+def _init_worker(model_filenames):
+    """
+    loads the models once in every worker process, all the images it processes then reuse them.
+    """
+    registry.warm_up(model_filenames)
+
+#######################################################################################################################
+
+def recognize(args):
+    """
+    runs the UserData stages, without any plotting, on the image file in args = (filename, text model,
+    character model, working size, tile size, measure) and returns a JSON serializable dictionary with:
+     - source --> the image filename
+     - characters --> the recognized characters
+     - boxes --> the bounding box (minr, minc, maxr, maxc) of each character
+     - scores --> the score of each character
+    With a tile size the image is processed tile by tile (see tiles.tiled_text).
+    With measure the stages are measured (see instrument.py) and their counters are returned as stages.
+    If the image cannot be processed only source and error are returned, so that one bad file
+    does not stop the whole batch.
+    """
+    filename, model_filename2, model_filename36, working_size, tile_size, measure = args
+    instruments = Instruments() if measure else None
+    try:
+        if tile_size:
+            result = tiled_text(filename, model_filename2, model_filename36, tile_size=tile_size, working_size=working_size,
+                                instruments=instruments)
+        else:
+            result = next(stream_text([filename], model_filename2, model_filename36, working_size, instruments))
+        result = {
+                 'source': filename,
+                 'characters': result['predicted_char'].tolist(),
+                 'boxes': result['coordinates'].tolist(),
+                 'scores': result['score'].tolist(),
+                 }
+    except Exception as error:
+        result = {'source': filename, 'error': '{}: {}'.format(type(error).__name__, error)}
+
+    if measure:
+        result['stages'] = instruments.stages
+    return result
+
+#######################################################################################################################
+
+def run_batch(patterns, model_filename2, model_filename36, workers=1, output=sys.stdout, working_size=None, tile_size=None,
+              instruments=None):
+    """
+    recognizes the text in every image file matching the glob patterns and writes one JSON line per
+    image to output, in the order of the files. With workers > 1 (-1 --> one per CPU) the images are
+    spread across a pool of processes, each loading the models once.
+    working_size is passed to UserData (preprocessing of big images at a lower resolution) and
+    tile_size, if given, makes every image be processed tile by tile (see tiles.tiled_text).
+    If instruments (an instrument.Instruments) is given, the stages of every image are measured
+    and added to it.
+    Returns (number of images, seconds).
+    """
+    if workers < 1 and workers != -1:
+        raise ValueError('workers must be positive or -1, got {}.'.format(workers))
+    filenames = sorted(set(filename for pattern in patterns for filename in glob(pattern)))
+    tasks = [(filename, model_filename2, model_filename36, working_size, tile_size, instruments is not None)
+             for filename in filenames]
+    workers = cpu_count() if workers == -1 else workers
+
+    start = default_timer()
+    if workers == 1:
+        _init_worker([model_filename2, model_filename36])
+        results = (recognize(task) for task in tasks)
+        pool = None
+    else:
+        pool = Pool(workers, initializer=_init_worker, initargs=([model_filename2, model_filename36],))
+        results = pool.imap(recognize, tasks)
+    try:
+        for result in results:
+            if instruments is not None:
+                instruments.merge(result.pop('stages'))
+            output.write(json.dumps(result) + '\n')
+        if pool is not None:
+            pool.close()
+    except:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+
+    return len(tasks), default_timer() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recognizes the text in a batch of images and writes JSON lines.')
+    parser.add_argument('images', nargs='+', help='image files or glob patterns (quote them to skip the shell expansion)')
+    parser.add_argument('--text-model', default='linearsvc-hog-fulltrain2-90.pickle', help='text/no-text model (.pickle or .npz)')
+    parser.add_argument('--char-model', default='linearsvc-hog-fulltrain36-90.pickle', help='character model (.pickle or .npz)')
+    parser.add_argument('--workers', type=workers_count, default=1, help='number of processes, -1 for one per CPU')
+    parser.add_argument('--output', help='file the JSON lines are written to, stdout by default')
+    parser.add_argument('--working-size', type=int, help='longest side (pixels) bigger images are preprocessed at')
+    parser.add_argument('--tile-size', type=int, help='process the images in tiles of this size (pixels), for very large images')
+    parser.add_argument('--metrics', help='file the per stage counters are written to (Prometheus text if it ends with .prom, JSON otherwise)')
+    args = parser.parse_args()
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    instruments = Instruments() if args.metrics else None
+    try:
+        n_images, seconds = run_batch(args.images, args.text_model, args.char_model, args.workers, output,
+                                      args.working_size, args.tile_size, instruments)
+    finally:
+        if args.output:
+            output.close()
+    if instruments is not None:
+        instruments.dump(args.metrics)
+    # on stderr, so that stdout only contains the JSON lines
+    sys.stderr.write('Processed {} images in {:.2f} seconds ({:.2f} images/sec)\n'.format(
+        n_images, seconds, n_images / seconds if seconds else 0))
@@ -0,0 +1,703 @@
+import os
+import sys
+import json
+import platform
+import argparse
+from contextlib import contextmanager
+import shutil
+import subprocess
+import tempfile
+from glob import glob
+from timeit import default_timer
+import string
+import cPickle
+import numpy as np
+import sklearn
+from skimage.io import imsave
+from skimage.draw import line
+from skimage.transform import resize
+from resample import resize_batch
+from sklearn.grid_search import GridSearchCV
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+from userimageski import UserData
+from data import OcrData, HOGFeatures
+from dataset import save_dataset
+from search import SuccessiveHalvingSearch
+from models import load_model, hog_step
+from manifest import load_manifests
+
+CHARACTERS = list(string.digits + string.ascii_lowercase)
+TEXT_MODEL = 'linearsvc-hog-fulltrain2-90.pickle'
+CHAR_MODEL = 'linearsvc-hog-fulltrain36-90.pickle'
+
+# modules userimageski and data used to import at load time, before plotting and training were made lazy
+EAGER_IMPORTS = ['skimage.io', 'matplotlib.pyplot', 'matplotlib.patches', 'skimage.color', 'sklearn.cross_validation',
+                 'sklearn.grid_search', 'sklearn.metrics', 'nolearn.convnet']
+
+STARTUP_SCRIPT = '''
+from timeit import default_timer
+start = default_timer()
+import sys
+import importlib
+for name in {imports!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+import numpy as np
+from userimageski import UserData
+user = UserData(np.load({image!r}), verbose=False)
+user.get_text_candidates()
+user.select_text_among_candidates({text_model!r})
+user.classify_text({char_model!r})
+print default_timer() - start, len(sys.modules)
+'''
+
+# trains a model on the dataset in path in a fresh interpreter and prints its time, accuracy and peak memory.
+# The peak is the highest anonymous resident memory (RssAnon) sampled by a thread during the training, less
+# the one before: the pages of the memory-mapped dataset are file pages, which do not count (the system can
+# drop them at any time). numpy and liblinear release the GIL in their long loops, so the thread keeps sampling.
+TRAINING_SCRIPT = '''
+import json
+import threading
+import time
+from timeit import default_timer
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+from data import HOGFeatures
+from dataset import load_dataset
+from streaming import train_streaming, score_streaming
+
+def rss_anon():
+    with open('/proc/self/status') as fin:
+        return [int(line.split()[1]) for line in fin if line.startswith('RssAnon:')][0] * 1024
+
+def sample(peak, running):
+    while running:
+        peak[0] = max(peak[0], rss_anon())
+        time.sleep(0.001)
+
+dataset = load_dataset({path!r})
+train = np.arange({n_train})
+test = np.arange({n_train}, dataset['target'].shape[0])
+hog = HOGFeatures(orientations=10, pixels_per_cell=(5, 5), cells_per_block=(2, 2), size=dataset['images'].shape[1:])
+start_anon = rss_anon()
+peak, running = [start_anon], [True]
+sampler = threading.Thread(target=sample, args=(peak, running))
+sampler.daemon = True
+sampler.start()
+start = default_timer()
+if {method!r} == 'linearsvc':
+    model = Pipeline([('hog', hog), ('clf', LinearSVC(C=2.0))])
+    model.fit(np.array(dataset['data'][train]), dataset['target'][train])
+else:
+    model = train_streaming(dataset['images'], dataset['target'], hog, train, {n_epochs}, {chunk_size})
+seconds = default_timer() - start
+running.pop()
+sampler.join()
+peak = max(peak[0], rss_anon()) - start_anon
+accuracy = score_streaming(model, dataset['images'], dataset['target'], test, {chunk_size})
+print json.dumps({{'seconds': seconds, 'peak': peak, 'accuracy': accuracy}})
+'''
+
+#######################################################################################################################
+
+def synthetic_components_image(n_components, blob=5, spacing=10):
+    """
+    returns a grey scale image containing n_components dark square blobs (blob x blob pixels)
+    laid out on a regular grid on a white background. Each blob is a separate connected component
+    big enough to pass the area filter of get_text_candidates.
+    """
+    per_row = int(np.ceil(np.sqrt(n_components)))
+    n_rows = int(np.ceil(float(n_components) / per_row))
+    image = np.ones((n_rows * spacing + spacing, per_row * spacing + spacing))
+    for k in range(n_components):
+        r = spacing + (k // per_row) * spacing
+        c = spacing + (k % per_row) * spacing
+        image[r:r + blob, c:c + blob] = 0
+    return image
+
+#######################################################################################################################
+
+def synthetic_glyphs(n_images, n_classes=36, size=(20, 20), n_strokes=3, random_state=0):
+    """
+    returns (images, labels): n_images grey scale (M x N) images of n_classes synthetic characters,
+    labeled like the Chars74K data ('0'-'9', 'a'-'z').
+    Every class is a fixed set of n_strokes random segments, every image jitters the segment ends by
+    one pixel and adds some noise, so the classes are separable but not trivially.
+    """
+    rng = np.random.RandomState(random_state)
+    bounds = np.array([size[0], size[1], size[0], size[1]]) - 1
+    templates = (rng.rand(n_classes, n_strokes, 4) * (bounds - 4) + 2).astype(int)
+    target = rng.randint(n_classes, size=n_images)
+
+    images = np.zeros((n_images,) + tuple(size))
+    for i, label in enumerate(target):
+        strokes = np.clip(templates[label] + rng.randint(-1, 2, size=(n_strokes, 4)), 0, bounds)
+        for r0, c0, r1, c1 in strokes:
+            rr, cc = line(r0, c0, r1, c1)
+            images[i, rr, cc] = 1
+    images = np.clip(images + 0.2 * rng.rand(*images.shape), 0, 1)
+
+    return images, np.array([CHARACTERS[label] for label in target])
+
+#######################################################################################################################
+
+def synthetic_scene(shape=(480, 640), char_size=24, random_state=0):
+    """
+    returns (image, characters): a grey scale image with rows of dark synthetic characters
+    (see synthetic_glyphs, drawn char_size pixels high) on a light noisy background, and the
+    characters drawn, row by row.
+    """
+    rng = np.random.RandomState(random_state)
+    step = int(1.5 * char_size)
+    n_rows, n_cols = (shape[0] - char_size) // step, (shape[1] - char_size) // step
+    glyphs, characters = synthetic_glyphs(n_rows * n_cols, random_state=random_state)
+
+    image = 0.85 + 0.1 * rng.rand(*shape)
+    for k, glyph in enumerate(glyphs):
+        r = char_size // 2 + (k // n_cols) * step
+        c = char_size // 2 + (k % n_cols) * step
+        ink = resize((glyph > 0.5).astype(float), (char_size, char_size))
+        image[r:r + char_size, c:c + char_size] *= 1 - 0.8 * ink
+
+    return image, characters
+
+#######################################################################################################################
+
+def synthetic_chars74k(folder, n_images, size=(40, 40), random_state=0):
+    """
+    writes in folder a tree laid out like the Chars74K data which OcrData reads: the list file
+    ImageTree/list_English_Img.m (list.ALLlabels, list.ALLnames) and one png per synthetic glyph
+    (see synthetic_glyphs) in Englishimg/Img/SampleXXX, drawn at size pixels.
+    Returns the config dictionary of an OcrData loading it (to be written to a config file).
+    """
+    images, characters = synthetic_glyphs(n_images, size=size, random_state=random_state)
+    labels = [CHARACTERS.index(char) + 1 for char in characters]
+    names = []
+    for i, (image, label) in enumerate(zip(images, labels)):
+        name = 'Sample{0:03d}/img{0:03d}-{1:05d}'.format(label, i + 1)
+        filename = os.path.join(folder, 'Englishimg', 'Img', name + '.png')
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        imsave(filename, (image * 255).astype(np.uint8))
+        names.append(name)
+
+    os.makedirs(os.path.join(folder, 'ImageTree'))
+    with open(os.path.join(folder, 'ImageTree', 'list_English_Img.m'), 'w') as fout:
+        fout.write('list.ALLlabels = [' + ';\n'.join(map(str, labels)) + ';\n];\n')
+        fout.write('list.ALLnames = [' + '\n'.join("'{}'".format(name) for name in names) + '\n];\n')
+        fout.write('list.classlabels = [1;\n];\n')
+
+    return {
+           'from_pickle': False,
+           'pickle_data': '',
+           'folder_labels': os.path.join(folder, 'ImageTree'),
+           'folder_data': folder,
+           'verbose': False,
+           'img_size': (20, 20),
+           'limit': 0,
+           'automatic_split': False,
+           'plot_evaluation': False,
+           'percentage_of_test_set': 0.10,
+           'n_jobs': 1,
+           'feature_store': os.path.join(folder, 'hog-features'),
+           }
+
+#######################################################################################################################
+
+def time_it(function, repeat=3):
+    """
+    runs function repeat times and returns the best wall-clock time in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = default_timer()
+        function()
+        best = min(best, default_timer() - start)
+    return best
+
+#######################################################################################################################
+
+def benchmark_text_candidates(n_components=(10, 100, 1000, 10000), repeat=3):
+    """
+    times UserData.get_text_candidates on synthetic images with a growing number of connected
+    components. With a linear extraction the time per component stays roughly constant.
+    Returns a list of (n_components, seconds, microseconds per component).
+    """
+    folder = tempfile.mkdtemp()
+    results = []
+    try:
+        for n in n_components:
+            filename = os.path.join(folder, 'components-{}.png'.format(n))
+            imsave(filename, synthetic_components_image(n))
+            user = UserData(filename)
+            seconds = time_it(user.get_text_candidates, repeat)
+            found = user.candidates['coordinates'].shape[0]
+            results.append((found, seconds, 1e6 * seconds / max(found, 1)))
+    finally:
+        shutil.rmtree(folder)
+
+    print '{:>12} {:>12} {:>16}'.format('components', 'seconds', 'us/component')
+    for found, seconds, per_component in results:
+        print '{:>12} {:>12.4f} {:>16.2f}'.format(found, seconds, per_component)
+
+    return results
+
+#######################################################################################################################
+
+def benchmark_search(n_images=3000, cv=3):
+    """
+    compares the exhaustive GridSearchCV with SuccessiveHalvingSearch on a reduced linearsvc-hog grid
+    over synthetic glyphs. Returns a list of (search, seconds, best_params_, best_score_).
+    """
+    images, target = synthetic_glyphs(n_images)
+    data = images.reshape((n_images, -1))
+    model = Pipeline([('hog', HOGFeatures(size=images.shape[1:])), ('clf', LinearSVC())])
+    param_grid = {
+                 'hog__orientations': [2, 5, 10],
+                 'hog__pixels_per_cell': [(4, 4), (5, 5)],
+                 'hog__cells_per_block': [(2, 2)],
+                 'clf__C': [0.1, 1, 10],
+                 }
+
+    results = []
+    for name, search in (('exhaustive', GridSearchCV(model, param_grid, cv=cv)),
+                         ('halving', SuccessiveHalvingSearch(model, param_grid, cv=cv))):
+        start = default_timer()
+        search.fit(data, target)
+        results.append((name, default_timer() - start, search.best_params_, search.best_score_))
+
+    for name, seconds, best_params, best_score in results:
+        print '{:>12} {:>10.2f}s  score {:.4f}  {}'.format(name, seconds, best_score, best_params)
+
+    return results
+
+#######################################################################################################################
+
+def train_text_model(char_model, filename, n_images=2000):
+    """
+    trains a text/no-text Pipeline(hog + LinearSVC) with the same HOG step as char_model on synthetic
+    glyphs (text, '1') against noise patches (no text, '0') and pickles it to filename.
+    Used to benchmark the inference when the two models can share their HOG features.
+    """
+    hog = hog_step(load_model(char_model))
+    glyphs, _ = synthetic_glyphs(n_images // 2, size=hog.size)
+    noise = np.random.RandomState(1).rand(n_images - n_images // 2, *hog.size)
+    data = np.concatenate((glyphs, noise)).reshape((n_images, -1))
+    target = np.array(['1'] * glyphs.shape[0] + ['0'] * noise.shape[0])
+
+    model = Pipeline([('hog', HOGFeatures(size=hog.size, orientations=hog.orientations,
+                                          pixels_per_cell=hog.pixels_per_cell,
+                                          cells_per_block=hog.cells_per_block)),
+                      ('clf', LinearSVC())])
+    model.fit(data, target)
+    with open(filename, 'wb') as fout:
+        cPickle.dump(model, fout, -1)
+    return filename
+
+#######################################################################################################################
+
+def benchmark_inference(text_model=TEXT_MODEL, char_model=CHAR_MODEL, shape=(480, 640), repeat=3):
+    """
+    times the whole UserData chain (preprocessing, text candidates, text/no-text filter and character
+    classification) on a synthetic scene of the size of lao.jpg, with the given models and with a text
+    model sharing the HOG step of char_model, computing the HOG features twice and once.
+    Returns a list of (models, share_hog, seconds).
+    """
+    image, _ = synthetic_scene(shape)
+    folder = tempfile.mkdtemp()
+    results = []
+    try:
+        shared_text_model = train_text_model(char_model, os.path.join(folder, 'text-shared-hog.pickle'))
+        for name, models in (('given', (text_model, char_model)), ('same hog', (shared_text_model, char_model))):
+            for share_hog in (False, True):
+                def run():
+                    user = UserData(image, verbose=False, share_hog=share_hog)
+                    user.get_text_candidates()
+                    user.select_text_among_candidates(models[0])
+                    user.classify_text(models[1])
+                load_model(models[0]), load_model(models[1])
+                results.append((name, share_hog, time_it(run, repeat)))
+    finally:
+        shutil.rmtree(folder)
+
+    print '{:>10} {:>10} {:>10}'.format('models', 'share_hog', 'seconds')
+    for name, share_hog, seconds in results:
+        print '{:>10} {:>10} {:>10.4f}'.format(name, share_hog, seconds)
+
+    return results
+
+#######################################################################################################################
+
+def benchmark_startup(text_model=TEXT_MODEL, char_model=CHAR_MODEL, repeat=3):
+    """
+    measures, in fresh interpreters, the time from the first import to the first prediction on a
+    synthetic scene, with the lazy imports of the plotting and training layers (after) and with
+    those modules imported up front as they used to be (before).
+    Returns a list of (layout, seconds, number of loaded modules).
+    """
+    folder = tempfile.mkdtemp()
+    results = []
+    try:
+        image = os.path.join(folder, 'scene.npy')
+        np.save(image, synthetic_scene()[0])
+        for layout, imports in (('before', EAGER_IMPORTS), ('after', [])):
+            script = STARTUP_SCRIPT.format(imports=imports, image=image, text_model=text_model, char_model=char_model)
+            runs = [subprocess.check_output([sys.executable, '-c', script]).split() for _ in range(repeat)]
+            results.append((layout, min(float(run[0]) for run in runs), int(runs[0][1])))
+    finally:
+        shutil.rmtree(folder)
+
+    print '{:>10} {:>10} {:>10}'.format('imports', 'seconds', 'modules')
+    for layout, seconds, modules in results:
+        print '{:>10} {:>10.4f} {:>10}'.format(layout, seconds, modules)
+
+    return results
+
+#######################################################################################################################
+
+def matching_boxes(reference, other, same_char=False, min_overlap=0.5):
+    """
+    returns the fraction of the boxes of reference (a classify_text dictionary) overlapping a box of
+    other by at least min_overlap (intersection over union) and, if same_char, with the same
+    predicted character.
+    """
+    if reference['coordinates'].shape[0] == 0:
+        return 1.0
+    found = 0
+    areas = np.prod(other['coordinates'][:, 2:] - other['coordinates'][:, :2], axis=1)
+    for box, char in zip(reference['coordinates'], reference['predicted_char']):
+        top_left = np.maximum(box[:2], other['coordinates'][:, :2])
+        bottom_right = np.minimum(box[2:], other['coordinates'][:, 2:])
+        intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+        union = np.prod(box[2:] - box[:2]) + areas - intersection
+        match = intersection >= min_overlap * union
+        if same_char:
+            match &= other['predicted_char'] == char
+        found += np.any(match)
+    return float(found) / reference['coordinates'].shape[0]
+
+#######################################################################################################################
+
+def benchmark_preprocessing(shapes=((480, 640), (960, 1280), (1920, 2560)), working_sizes=(640, 960),
+                            text_model=TEXT_MODEL, char_model=CHAR_MODEL):
+    """
+    runs the whole UserData chain on synthetic scenes of growing size (characters growing with the
+    image, as in photos taken closer or with a better camera), preprocessing at full resolution and
+    at each of working_sizes. Accuracy is measured against the full resolution path (see matching_boxes):
+    the fraction of its boxes found again (boxes) and found again with the same character (chars).
+    The synthetic glyphs are not real characters, so chars mostly tells how stable the character model
+    is to small changes of the crops, boxes is the detection accuracy of the downscaled path.
+    Returns a list of (shape, working_size, seconds, boxes, chars), working_size None being full resolution.
+    """
+    load_model(text_model), load_model(char_model)
+    results = []
+    for shape in shapes:
+        image, _ = synthetic_scene(shape, char_size=shape[0] // 20)
+        for size in (None,) + tuple(working_sizes):
+            start = default_timer()
+            user = UserData(image, verbose=False, working_size=size)
+            user.get_text_candidates()
+            user.select_text_among_candidates(text_model)
+            which_text = user.classify_text(char_model)
+            seconds = default_timer() - start
+            if size is None:
+                reference = which_text
+            results.append((shape, size, seconds, matching_boxes(reference, which_text),
+                            matching_boxes(reference, which_text, same_char=True)))
+
+    print '{:>12} {:>12} {:>10} {:>8} {:>8}'.format('shape', 'working_size', 'seconds', 'boxes', 'chars')
+    for shape, size, seconds, boxes, chars in results:
+        print '{:>12} {:>12} {:>10.4f} {:>8.3f} {:>8.3f}'.format('{}x{}'.format(*shape), size or 'full', seconds, boxes, chars)
+
+    return results
+
+#######################################################################################################################
+
+def benchmark_resize(n_images=2000, output_shape=(20, 20), repeat=3, random_state=0):
+    """
+    times the resizing of n_images random crops (sizes between 5 and 80 pixels, uint8 and float) with
+    skimage.transform.resize one by one and with resample.resize_batch (tests/test_resample.py checks
+    that they give the same images).
+    Returns (seconds one by one, seconds batched).
+    """
+    rng = np.random.RandomState(random_state)
+    images = []
+    for i in range(n_images):
+        shape = tuple(rng.randint(5, 81, size=2))
+        image = rng.rand(*shape)
+        images.append((image * 255).astype(np.uint8) if i % 2 else image)
+
+    one_by_one = time_it(lambda: [resize(image, output_shape) for image in images], repeat)
+    batched = time_it(lambda: resize_batch(images, output_shape), repeat)
+
+    print '{:>10} {:>12} {:>10}'.format('images', 'one by one', 'batched')
+    print '{:>10} {:>12.4f} {:>10.4f}'.format(n_images, one_by_one, batched)
+
+    return one_by_one, batched
+
+#######################################################################################################################
+
+def legacy_manifests(folder_labels):
+    """
+    returns (paths, labels) as OcrData.getRelativePath and getLabels used to build them, reading
+    every .m file twice with readlines. Reference of benchmark_manifests.
+    """
+    mfiles = glob(os.path.join(folder_labels, '*.m'))
+    prefixes = {'Img': ['Englishimg', 'Img'], 'Fnt': ['EnglishFnt', 'Fnt'], 'Hnd': ['EnglishHnd', 'Hnd']}
+
+    paths = []
+    for mfile in mfiles:
+        prefix = [folders for name, folders in sorted(prefixes.items()) if name in mfile][0]
+        with open(mfile) as m:
+            lines = m.readlines()
+        for index, line in enumerate(lines):
+            if line.startswith('list.ALLnames'):
+                start_index = index
+                paths.append(os.path.join(*(prefix + line[18:].strip()[:-1].split('/'))))
+            elif line.startswith('list.classlabels'):
+                end_index = index - 1
+        paths += [os.path.join(*(prefix + line.strip()[1:-1].split('/'))) for line in lines[start_index + 1:end_index]]
+
+    labels = []
+    for mfile in mfiles:
+        with open(mfile) as m:
+            lines = m.readlines()
+        for index, line in enumerate(lines):
+            if line.startswith('list.ALLlabels'):
+                start_index = index
+                labels.append(line[18:].strip()[:-1])
+            elif line.startswith('list.ALLnames'):
+                end_index = index - 1
+        labels += [line.strip()[:-1] for line in lines[start_index + 1:end_index]]
+    classes = dict(zip(range(1, 63), map(str, range(10)) + list(string.ascii_lowercase) * 2))
+
+    return paths, [classes[int(label)] for label in labels]
+
+#######################################################################################################################
+
+def benchmark_manifests(folder_labels='ImageTree', repeat=3):
+    """
+    times the parsing of the shipped .m manifests (list_English_Img.m and list_English_Hnd.m) the old way
+    (legacy_manifests), with the single pass parser (manifest.load_manifests) and from its cache
+    (tests/test_manifest.py checks that the three return the same (path, label) records).
+    Returns a list of (method, seconds).
+    """
+    folder = tempfile.mkdtemp()
+    cache = os.path.join(folder, 'manifest-cache.npz')
+    try:
+        load_manifests(folder_labels, cache)
+        results = [
+                  ('two passes', time_it(lambda: legacy_manifests(folder_labels), repeat)),
+                  ('single pass', time_it(lambda: load_manifests(folder_labels), repeat)),
+                  ('cached', time_it(lambda: load_manifests(folder_labels, cache), repeat)),
+                  ]
+    finally:
+        shutil.rmtree(folder)
+
+    print '{:>12} {:>10}'.format('method', 'seconds')
+    for method, seconds in results:
+        print '{:>12} {:>10.4f}'.format(method, seconds)
+
+    return results
+
+#######################################################################################################################
+
+def benchmark_streaming_training(n_images=40000, test_size=0.25, n_epochs=5, chunk_size=2000):
+    """
+    trains the HOG + linear SVM character model of generate_best_hog_model on n_images synthetic glyphs
+    saved as a dataset folder, in memory (LinearSVC on the whole train set) and out of core
+    (streaming.train_streaming, SGDClassifier fed chunk_size images at a time for n_epochs epochs),
+    each in a fresh interpreter (see TRAINING_SCRIPT).
+    Returns a list of (method, seconds, train images/sec, peak MB allocated, test accuracy).
+    """
+    images, target = synthetic_glyphs(n_images)
+    n_train = int(n_images * (1 - test_size))
+    train_bytes = images[:n_train].nbytes
+    folder = tempfile.mkdtemp()
+    results = []
+    try:
+        path = save_dataset(os.path.join(folder, 'glyphs'), images, target, 'synthetic glyphs')
+        del images
+        for method, epochs in (('linearsvc', 1), ('sgd', n_epochs)):
+            script = TRAINING_SCRIPT.format(path=path, n_train=n_train, method=method, n_epochs=n_epochs,
+                                            chunk_size=chunk_size)
+            run = json.loads(subprocess.check_output([sys.executable, '-c', script]).splitlines()[-1])
+            results.append((method, run['seconds'], n_train * epochs / run['seconds'], run['peak'] / 2.0**20,
+                            run['accuracy']))
+    finally:
+        shutil.rmtree(folder)
+
+    print 'train set: {} images ({:.1f} MB)'.format(n_train, train_bytes / 2.0**20)
+    print '{:>10} {:>10} {:>12} {:>10} {:>10}'.format('method', 'seconds', 'images/sec', 'peak MB', 'accuracy')
+    for method, seconds, throughput, peak, accuracy in results:
+        print '{:>10} {:>10.2f} {:>12.0f} {:>10.1f} {:>10.4f}'.format(method, seconds, throughput, peak, accuracy)
+
+    return results
+
+#######################################################################################################################
+
+@contextmanager
+def quiet():
+    """
+    silences what the benchmarked code prints on stdout.
+    """
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+#######################################################################################################################
+
+def run_suite(filename, n_images=2000, repeat=3, text_model=TEXT_MODEL, char_model=CHAR_MODEL):
+    """
+    times the training and inference hot paths on synthetic data generated offline (see synthetic_chars74k,
+    synthetic_glyphs and synthetic_scene, all seeded):
+     - hog_transform --> HOGFeatures.transform of n_images 20x20 glyphs, with the HOG step of char_model
+     - ocr_load --> OcrData.load of a Chars74K-like tree of n_images png files
+     - ocr_load_dataset --> OcrData.load of the dataset folder saved by the previous load
+     - split_train_test --> OcrData.split_train_test (10% test set)
+     - grid_search --> OcrData.perform_grid_search_cv on a reduced linearsvc-hog grid (timed once)
+     - inference --> the whole UserData chain on a 480x640 synthetic scene
+    and writes the best time of each to filename as JSON, with items/second and a description of the
+    machine and library versions. Returns the written dictionary.
+    """
+    folder = tempfile.mkdtemp()
+    results = {}
+
+    def record(name, seconds, items, runs=repeat):
+        results[name] = {'seconds': seconds, 'items': items, 'items_per_second': items / seconds, 'repeat': runs}
+
+    try:
+        glyphs, _ = synthetic_glyphs(n_images)
+        hog = hog_step(load_model(char_model))
+        transform = HOGFeatures(size=hog.size, orientations=hog.orientations,
+                                pixels_per_cell=hog.pixels_per_cell, cells_per_block=hog.cells_per_block)
+        record('hog_transform', time_it(lambda: transform.transform(glyphs.reshape((n_images, -1))), repeat), n_images)
+
+        config = synthetic_chars74k(os.path.join(folder, 'chars74k'), n_images)
+        config_file = os.path.join(folder, 'ocr-config.py')
+        with open(config_file, 'w') as fout:
+            fout.write(repr(config))
+        data = []
+        with quiet():
+            record('ocr_load', time_it(lambda: data.append(OcrData(config_file)), repeat), n_images)
+
+            config['from_pickle'] = True
+            config['pickle_data'] = [name for name in os.listdir(config['folder_data']) if name.startswith('images-')][0]
+            config['automatic_split'] = True
+            with open(config_file, 'w') as fout:
+                fout.write(repr(config))
+            record('ocr_load_dataset', time_it(lambda: data.append(OcrData(config_file)), repeat), n_images)
+            record('split_train_test', time_it(data[-1].split_train_test, repeat), n_images)
+
+            ocr = data[-1]
+            model, _ = ocr.cross_val_models['linearsvc-hog']
+            ocr.cross_val_models['linearsvc-hog'] = (model, {
+                                                            'hog__orientations': [5, 10],
+                                                            'hog__pixels_per_cell': [(4, 4), (5, 5)],
+                                                            'hog__cells_per_block': [(2, 2)],
+                                                            'clf__C': [0.1, 1],
+                                                            })
+            record('grid_search', time_it(lambda: ocr.perform_grid_search_cv('linearsvc-hog'), 1),
+                   ocr.data_train.shape[0], 1)
+
+        image, _ = synthetic_scene()
+        load_model(text_model)
+        def inference():
+            user = UserData(image, verbose=False)
+            user.get_text_candidates()
+            user.select_text_among_candidates(text_model)
+            user.classify_text(char_model)
+        record('inference', time_it(inference, repeat), 1)
+    finally:
+        shutil.rmtree(folder)
+
+    run = {
+          'machine': {
+                     'platform': platform.platform(),
+                     'processor': platform.processor(),
+                     'python': platform.python_version(),
+                     'numpy': np.__version__,
+                     'sklearn': sklearn.__version__,
+                     },
+          'n_images': n_images,
+          'results': results,
+          }
+    with open(filename, 'w') as fout:
+        json.dump(run, fout, indent=2, sort_keys=True)
+
+    print '{:>18} {:>10} {:>12}'.format('benchmark', 'seconds', 'items/sec')
+    for name in sorted(results):
+        print '{:>18} {:>10.4f} {:>12.1f}'.format(name, results[name]['seconds'], results[name]['items_per_second'])
+
+    return run
+
+#######################################################################################################################
+
+def compare_runs(old_filename, new_filename, tolerance=0.10):
+    """
+    compares two files written by run_suite and flags as regressions the benchmarks which got slower
+    by more than tolerance (0.10 --> 10%). Returns the list of (name, old seconds, new seconds, ratio)
+    of the regressions.
+    """
+    with open(old_filename) as fin:
+        old = json.load(fin)
+    with open(new_filename) as fin:
+        new = json.load(fin)
+
+    if old['machine'] != new['machine']:
+        print 'Warning: the two runs come from different machines or library versions.'
+
+    regressions = []
+    print '{:>18} {:>10} {:>10} {:>8}'.format('benchmark', 'old', 'new', 'ratio')
+    for name in sorted(set(old['results']) & set(new['results'])):
+        before, after = old['results'][name]['seconds'], new['results'][name]['seconds']
+        ratio = after / before
+        flag = 'REGRESSION' if ratio > 1 + tolerance else ''
+        print '{:>18} {:>10.4f} {:>10.4f} {:>8.2f} {}'.format(name, before, after, ratio, flag)
+        if flag:
+            regressions.append((name, before, after, ratio))
+
+    return regressions
+
+# the benchmarks run by name from the command line, in this order when none is named
+BENCHMARKS = [
+             ('text_candidates', benchmark_text_candidates),
+             ('search', benchmark_search),
+             ('inference', benchmark_inference),
+             ('startup', benchmark_startup),
+             ('preprocessing', benchmark_preprocessing),
+             ('resize', benchmark_resize),
+             ('manifests', benchmark_manifests),
+             ('streaming_training', benchmark_streaming_training),
+             ]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of the OCR training and inference paths.')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help='benchmarks to run, among {} (all of them by default)'.format(', '.join(name for name, _ in BENCHMARKS)))
+    parser.add_argument('--suite', metavar='OUTPUT', help='run the benchmark suite and write its results (JSON) to OUTPUT')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two suite results, exit with status 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='slowdown flagged as a regression by --compare (default 0.10)')
+    args = parser.parse_args()
+    unknown = sorted(set(args.benchmarks) - set(name for name, _ in BENCHMARKS))
+    if unknown:
+        parser.error('unknown benchmarks: {}'.format(', '.join(unknown)))
+
+    if args.suite:
+        run_suite(args.suite)
+    elif args.compare:
+        sys.exit(1 if compare_runs(args.compare[0], args.compare[1], args.tolerance) else 0)
+    else:
+        for name, benchmark in BENCHMARKS:
+            if not args.benchmarks or name in args.benchmarks:
+                print '== {}'.format(name)
+                benchmark()
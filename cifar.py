@@ -3,10 +3,9 @@ import re
 import sys
 import cPickle
 import numpy as np
-from skimage.io import imread
 from datetime import datetime
-from skimage.transform import resize
-from matplotlib import pyplot as plt
+from resample import resize_batch
+from dataset import is_dataset, load_dataset, save_dataset, storage_dtype
 
 class Cifar():
     """
@@ -25,6 +24,8 @@ class Cifar():
         self.verbose = self.config['verbose']
         self.from_pickle = self.config['from_pickle']
         self.pickle_data = self.config['pickle_data']
+        self.chunk_size = self.config.get('chunk_size', 1000)
+        self.storage_dtype = storage_dtype(self.config.get('storage_dtype', 'float64'))
         self.load()
 
 ########################################################################################################################
@@ -40,11 +41,19 @@ class Cifar():
     def load(self):
         """
         loads cifar data into python dictionary.
+        if from_pickle == True pickle_data is either a dataset folder (see dataset.save_dataset),
+        whose images are memory-mapped, or a legacy .pickle file.
+        Otherwise the images are stored as storage_dtype (see dataset.storage_dtype).
         """
-
         if self.from_pickle:
+            full_name = os.path.join(self.folder,self.pickle_data)
+            if is_dataset(full_name):
+                self.cif = load_dataset(full_name)
+                if self.verbose:
+                    print 'Loaded {} images each {} pixels'.format(self.cif['images'].shape[0], self.img_size)
+                return self.cif
             try:
-                with open(os.path.join(self.folder,self.pickle_data), 'rb') as fin:
+                with open(full_name, 'rb') as fin:
                     self.cif = cPickle.load(fin)
                     if self.verbose:
                         print 'Loaded {} images each {} pixels'.format(self.cif['images'].shape[0], self.img_size)
@@ -54,16 +63,17 @@ class Cifar():
                 print 'You have not provided a .pickle file to load data from!'
                 sys.exit(0)
         else:
-    
+            from skimage.io import imread
+
             filenames = [os.path.join(self.folder,f) for f in os.listdir(self.folder) if re.match(r'[0-9]+.*\.png', f)]
             n_images = len(filenames)
             target = [0]*n_images
-            images = np.zeros((n_images,) + self.img_size)
+            images = np.zeros((n_images,) + self.img_size, dtype=self.storage_dtype)
         
-            for index, filename in enumerate(filenames):
-                image = imread(filename, as_grey=True)
-                image = resize(image, self.img_size)
-                images[index] = image
+            # read chunk_size images at a time, resized together straight into images
+            for start in range(0, n_images, self.chunk_size):
+                chunk = [imread(filename, as_grey=True) for filename in filenames[start:start + self.chunk_size]]
+                resize_batch(chunk, self.img_size, out=images[start:start + len(chunk)])
         
             if self.verbose:
                 print "Loaded {} images.".format(n_images)
@@ -75,10 +85,8 @@ class Cifar():
                 }
             
             now = str(datetime.now()).replace(':','-')   
-            fname_out = 'images-{}-{}-{}.pickle'.format(len(target), self.img_size, now)
-            full_name = os.path.join(self.folder,fname_out)
-            with open(full_name, 'wb') as fout:
-                cPickle.dump(self.cif, fout, -1)
+            fname_out = 'images-{}-{}-{}'.format(len(target), self.img_size, now)
+            save_dataset(os.path.join(self.folder,fname_out), images, self.cif['target'], 'cifar')
                         
             return self.cif
 
@@ -88,6 +96,8 @@ class Cifar():
         """
         plots 100 images with relative label randomly picked from loaded data.
         """
+        from matplotlib import pyplot as plt
+
         n_images = self.cif['images'].shape[0]
     
         fig = plt.figure(figsize=(12, 12))
@@ -1,26 +1,27 @@
 import os
 import cPickle
 import numpy as np
-from skimage.io import imread
-from skimage.transform import resize
-from glob import glob
-import string
-from matplotlib import pyplot as plt
+from resample import resize_batch
 import sys
 from random import seed, sample
+from multiprocessing import Pool, cpu_count
+from multiprocessing.sharedctypes import RawArray
 from pprint import pprint
 from datetime import datetime
 from sklearn.base import BaseEstimator
-from skimage.feature import hog
-from skimage import color
-from sklearn import cross_validation
-from sklearn.grid_search import GridSearchCV
+from hog import batch_hog
+from features import FeatureStore, StoredHOGFeatures
 from sklearn.pipeline import Pipeline
 from sklearn.svm import LinearSVC
-from sklearn.metrics import confusion_matrix
-from nolearn.convnet import ConvNetFeatures
-from sklearn.metrics import accuracy_score
-from cifar import Cifar
+from models import load_model
+from dataset import is_dataset, load_dataset, save_dataset, storage_dtype, as_float, MergedDataset
+from split import random_split, stratified_split, take
+from imagestore import ImageStore
+from manifest import load_manifests
+# image reading (skimage.io imports matplotlib), plotting, model selection and convnet modules are imported
+# inside the methods using them:
+# unpickling a model only imports this module for HOGFeatures, and a headless OCR process
+# should not pay for (or need) any of them.
 
 class OcrData():
     """
@@ -51,6 +52,16 @@ class OcrData():
         self.automatic_split = self.config['automatic_split']
         self.plot_evaluation = self.config['plot_evaluation']
         self.split = self.config['percentage_of_test_set']
+        self.stratify = self.config.get('stratify', False)
+        self.n_jobs = self.config.get('n_jobs', 1)
+        self.feature_store = self.config.get('feature_store', os.path.join(self.folder_data, 'hog-features'))
+        self.chunk_size = self.config.get('chunk_size', 1000)
+        self.storage_dtype = storage_dtype(self.config.get('storage_dtype', 'float64'))
+        self.cifar_config = self.config.get('cifar_config', '/home/francesco/Dropbox/DSR/OCR/cifar-config.py')
+        self.text_config = self.config.get('text_config', '/home/francesco/Dropbox/DSR/OCR/text-config.py')
+        self.image_store = self.config.get('image_store', None)
+        self.manifest_cache = self.config.get('manifest_cache', None)
+        self.train_chunk_size = self.config.get('train_chunk_size', 10000)
         self.cross_val_models = self.set_models()
         self.load()
         if self.automatic_split:
@@ -65,6 +76,18 @@ class OcrData():
         """
         return eval(open(filename).read())        
         
+########################################################################################################################        
+        
+    def manifest(self):
+        """
+        returns the (relative paths, labels) of all the images listed by the .m files in folder_labels,
+        parsed once per instance (and read back from manifest_cache, if set, as long as the .m files
+        did not change, see manifest.load_manifests).
+        """
+        if not hasattr(self, '_manifest'):
+            self._manifest = load_manifests(self.folder_labels, self.manifest_cache)
+        return self._manifest
+
 ########################################################################################################################        
         
     def getRelativePath(self):
@@ -75,33 +98,9 @@ class OcrData():
         - Img
         - Fnt
         - Hnd
+        The .m files are parsed together with the labels (see manifest).
         """
-        mfiles = [os.path.join(self.folder_labels,mfile) for mfile in glob(os.path.join(self.folder_labels,'*.m'))]
-
-        self.images = []
-        
-        for mfile in mfiles:
-            m = open(mfile, "r")
-            lines = m.readlines()
-            for index, line in enumerate(lines):
-                if line.startswith('list.ALLnames'):
-                    start_index = index
-                    start_image = line[18:].strip()[:-1 ]
-                    if 'Img' in mfile:
-                        self.images.append(os.path.join(*(['Englishimg','Img'] + start_image.split('/'))))
-                    elif 'Fnt' in mfile:
-                        self.images.append(os.path.join(*(['EnglishFnt','Fnt'] + start_image.split('/'))))
-                    elif 'Hnd' in mfile:
-                        self.images.append(os.path.join(*(['EnglishHnd','Hnd'] + start_image.split('/'))))
-                elif line.startswith('list.classlabels'):
-                    end_index = index - 1
-            if 'Img' in mfile:
-                self.images += [os.path.join(*(['Englishimg','Img'] + line.strip()[1:-1].split('/'))) for line in lines[start_index+1:end_index]]
-            elif 'Fnt' in mfile:
-                self.images += [os.path.join(*(['EnglishFnt','Fnt'] + line.strip()[1:-1].split('/'))) for line in lines[start_index+1:end_index]]
-            elif 'Hnd' in mfile:
-                self.images += [os.path.join(*(['EnglishHnd','Hnd'] + line.strip()[1:-1].split('/'))) for line in lines[start_index+1:end_index]]
-            m.close()
+        self.images = list(self.manifest()[0])
         
         if self.verbose:
             print 'Found {} images.'.format(len(self.images))
@@ -125,30 +124,9 @@ class OcrData():
         For the sake of simplicity lowercase is considered the same as uppercase and now we have 36 classes:
         - [0-9] --> 10
         - [(a == A)-(z == Z)]
+        The .m files are parsed together with the paths (see manifest).
         """
-        mfiles = [os.path.join(self.folder_labels,mfile) for mfile in glob(os.path.join(self.folder_labels,'*.m'))]
-
-        self.labels = []        
- 
-        for mfile in mfiles:
-            m = open(mfile, "r")
-            lines = m.readlines()
-            for index, line in enumerate(lines):
-                if line.startswith('list.ALLlabels'):
-                    start_index = index
-                    start_label = line[18:].strip()[:-1 ]
-                    self.labels.append(start_label)
-                    
-                elif line.startswith('list.ALLnames'):
-                    end_index = index - 1
-            self.labels += [line.strip()[:-1] for line in lines[start_index+1:end_index]]
-            m.close()
-
-        keys = range(1,63)
-        values = map(str, range(10)) + list(string.ascii_lowercase) + list(string.ascii_lowercase) 
-        
-        classes = dict(zip(keys, values))
-        self.labels = map(lambda x: classes[int(x)], self.labels)
+        self.labels = list(self.manifest()[1])
         
         if self.verbose:
             print 'Found {} labels.'.format(len(self.labels))        
@@ -165,13 +143,28 @@ class OcrData():
          - images --> shuffled (M x N) images
          - data --> matrix of flattened images (n_images x (M x N))
          - target --> labels of each image 
-        if from_pickle == True and pickle_data == 'path/to/pickle/dictionary' the load method simply 
-        returns the same dictionary as before previously loaded and saved.
+        The images are stored as storage_dtype (float64, float32 or uint8 quantized grey levels, see
+        dataset.storage_dtype), and only converted to float64 grey levels in [0, 1] by the first step of the
+        models: the HOG features (see hog.batch_hog) or GreyLevels, chunk by chunk or model by model.
+        The loaded data is saved as a dataset folder (see dataset.save_dataset).
+        if from_pickle == True and pickle_data == 'path/to/dataset' the load method simply 
+        returns the same dictionary as before previously loaded and saved, with the images memory-mapped
+        (in the dtype they were saved with).
+        pickle_data can also be a legacy .pickle file holding the whole dictionary.
+        if n_jobs != 1 the images are read and resized by a pool of processes (see load_parallel).
+        if image_store == 'path/to/store' (relative to folder_data) the resized images are kept in an
+        imagestore.ImageStore, and only the images new or changed since the previous load are read again.
         """
         
         if self.from_pickle:
+            full_name = os.path.join(self.folder_data,self.pickle_data)
+            if is_dataset(full_name):
+                self.ocr = load_dataset(full_name, self.limit)
+                if self.verbose:
+                    print 'Loaded {} images each {} pixels'.format(self.ocr['images'].shape[0], self.img_size)
+                return self.ocr
             try:
-                with open(os.path.join(self.folder_data,self.pickle_data), 'rb') as fin:
+                with open(full_name, 'rb') as fin:
                     self.ocr = cPickle.load(fin)
                     if self.limit==0:
                         pass
@@ -196,20 +189,16 @@ class OcrData():
                 complete = zip(image_paths, image_labels)
             else:
                 complete = zip(image_paths[:self.limit], image_labels[:self.limit])
-            n_images = len(complete)
-            im = np.zeros((n_images,) + self.img_size)        
-            labels = []
-            i=0
-            
-            for couple in complete:
-                image = imread(os.path.join(self.folder_data, couple[0] + '.png'), as_grey=True)
-                sh = image.shape
-                if ((sh[0]*sh[1]) >= (self.img_size[0]*self.img_size[1])):
-                    im[i] = resize(image, self.img_size)
-                    i+=1
-                    labels.append(couple[1])          
-            im = im[:len(labels)]   
-            
+            if self.image_store:
+                store = ImageStore(os.path.join(self.folder_data, self.image_store), self.img_size, self.storage_dtype)
+                n_jobs = cpu_count() if self.n_jobs == -1 else self.n_jobs
+                im, kept = store.update(self.folder_data, complete, self.read_images, self.chunk_size * n_jobs)
+                if self.verbose:
+                    print 'Read {} new or changed images, {} from the image store'.format(store.decoded, store.reused)
+            else:
+                im, kept = self.read_images(complete)
+            labels = [couple[1] for couple, is_kept in zip(complete, kept) if is_kept]
+
             seed(10)
             k = sample(range(len(im)), len(im))
             im_shuf = im[k]
@@ -225,13 +214,80 @@ class OcrData():
                  }
             
             now = str(datetime.now()).replace(':','-')   
-            fname_out = 'images-{}-{}-{}.pickle'.format(len(labels), self.img_size, now)
-            full_name = os.path.join(self.folder_data,fname_out)
-            with open(full_name, 'wb') as fout:
-                cPickle.dump(self.ocr, fout, -1)
-                
+            fname_out = 'images-{}-{}-{}'.format(len(labels), self.img_size, now)
+            save_dataset(os.path.join(self.folder_data,fname_out), im_shuf, labels_shuf, 'chars74k')
+
             return self.ocr
 
+###########################################################################################################################################
+
+    def read_images(self, complete):
+        """
+        given a list of (relative path, label) couples returned by getRelativePath and getLabels,
+        reads and resizes the images, in a pool of n_jobs processes if n_jobs != 1 (see load_parallel).
+        Images smaller than img_size are dropped.
+        Returns (images, kept): the resized images kept and, for each couple, whether it was kept.
+        """
+        from skimage.io import imread
+
+        if self.n_jobs != 1:
+            return self.load_parallel(complete)
+
+        im = np.zeros((len(complete),) + self.img_size, dtype=self.storage_dtype)
+        kept = np.zeros(len(complete), dtype=bool)
+        i=0
+
+        # the images big enough are resized chunk_size at a time, straight into im
+        chunk = []
+        for index, couple in enumerate(complete):
+            image = imread(os.path.join(self.folder_data, couple[0] + '.png'), as_grey=True)
+            sh = image.shape
+            if ((sh[0]*sh[1]) >= (self.img_size[0]*self.img_size[1])):
+                chunk.append(image)
+                kept[index] = True
+            if len(chunk) == self.chunk_size:
+                resize_batch(chunk, self.img_size, out=im[i:i + len(chunk)])
+                i += len(chunk)
+                chunk = []
+        resize_batch(chunk, self.img_size, out=im[i:i + len(chunk)])
+
+        return im[:i + len(chunk)], kept
+
+###########################################################################################################################################
+
+    def load_parallel(self, complete):
+        """
+        given the list of (relative path, label) couples returned by getRelativePath and getLabels,
+        reads and resizes the images across a pool of n_jobs processes.
+        The couples are split in shards of chunk_size images and every worker writes the resized
+        images straight into a preallocated array shared by all processes.
+        Images smaller than img_size are dropped exactly as in the serial load, so that the returned
+        (images, kept) are identical to the ones built by a single process (see read_images).
+        """
+        n_images = len(complete)
+        shape = (n_images,) + self.img_size
+        shared = RawArray(self.storage_dtype.char, int(np.prod(shape)))
+        filenames = [os.path.join(self.folder_data, couple[0] + '.png') for couple in complete]
+        chunks = [(start, filenames[start:start + self.chunk_size], self.img_size)
+                  for start in range(0, n_images, self.chunk_size)]
+
+        n_jobs = cpu_count() if self.n_jobs == -1 else self.n_jobs
+        pool = Pool(n_jobs, initializer=_init_shared_images, initargs=(shared, shape, self.storage_dtype))
+        loaded = np.zeros(n_images, dtype=bool)
+        try:
+            for start, kept in pool.imap_unordered(_load_chunk, chunks):
+                loaded[start:start + len(kept)] = kept
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+        im = np.frombuffer(shared, dtype=self.storage_dtype).reshape(shape)[loaded]
+
+        return im, loaded
+
 ###########################################################################################################################################
 
     def split_train_test(self):
@@ -239,38 +295,44 @@ class OcrData():
         given the dictionary returned by the load method it returns two datasets: 
         - train set --> (1-self.split)% of originally loaded data
         - test set --> self.split% of originally loaded data
+        The split is made on index arrays (see split.py): with stratify == True every label keeps
+        its proportion in both sets, otherwise the test set is the same random seed-10 sample as always.
         """ 
 
-        seed(10)
-        total = len(self.ocr['target'])
-        population = range(total)
         if self.split==0:
-            self.images_train = self.ocr['images']
-            self.data_train = self.ocr['data']
-            self.labels_train = self.ocr['target']
+            self.images_train, self.data_train, self.labels_train = take(self.ocr, slice(None))
             
             return self.images_train, self.data_train, self.labels_train
         else:
-            k = int(np.floor(total * self.split))
-            test = sample(population, k)
-            train = [i for i in population if i not in test]
+            train, test = self.split_indices()
             
-            self.images_train = self.ocr['images'][train]
-            self.data_train = self.ocr['data'][train]
-            self.labels_train = self.ocr['target'][train]
-            
-            self.images_test = self.ocr['images'][test]
-            self.data_test = self.ocr['data'][test]
-            self.labels_test = self.ocr['target'][test]
+            self.images_train, self.data_train, self.labels_train = take(self.ocr, train)
+            self.images_test, self.data_test, self.labels_test = take(self.ocr, test)
     
             return self.images_train, self.data_train, self.labels_train, self.images_test, self.data_test, self.labels_test
         
+###########################################################################################################################################
+
+    def split_indices(self):
+        """
+        returns the (train, test) index arrays of split_train_test, without gathering the images.
+        With percentage_of_test_set == 0 every image is in the train set.
+        """
+        total = len(self.ocr['target'])
+        if self.split==0:
+            return np.arange(total), np.arange(0)
+        if self.stratify:
+            return stratified_split(self.ocr['target'], self.split)
+        return random_split(total, self.split)
+
 ###########################################################################################################################################
 
     def plot_some(self):
         """
         plots 100 images with relative label randomly picked from loaded data.
         """
+        from matplotlib import pyplot as plt
+
         n_images = self.ocr['images'].shape[0]
     
         fig = plt.figure(figsize=(12, 12))
@@ -293,8 +355,8 @@ class OcrData():
 
         models = {
             'linearsvc': (
-                LinearSVC(),
-                {'C':  list(np.arange(0.01,1.5,0.01))}, 
+                Pipeline([('grey', GreyLevels()), ('clf', LinearSVC())]),
+                {'clf__C':  list(np.arange(0.01,1.5,0.01))}, 
                 ),
 
             'linearsvc-hog': (
@@ -320,12 +382,18 @@ class OcrData():
 
 ####################################################################################################################################
 
-    def perform_grid_search_cv(self, model_name):
+    def perform_grid_search_cv(self, model_name, search='grid'):
         """
         given a labeled train set (X_train, y_train) and a model_name among the
         ones set by the set_models method, returns the best model out of all
-        parameters combinations using the specified algorithm
+        parameters combinations using the specified algorithm.
+        search == 'grid' cross-validates every combination on the whole train set (GridSearchCV),
+        search == 'halving' uses SuccessiveHalvingSearch, which discards the weaker half of the
+        combinations after each round on a growing subsample of the train set.
         """
+        from sklearn.grid_search import GridSearchCV
+        from search import SuccessiveHalvingSearch
+
         if not self.automatic_split:
             print 'Before performing any ML you should split your data!'
             print 'Change to True the automatic_split in the config file.'
@@ -338,8 +406,22 @@ class OcrData():
         print 'Train set shape: ', self.data_train.shape
         print 'Target shape: ', self.labels_train.shape
         
-        gs = GridSearchCV(model, param_grid, n_jobs=-1, cv=3, verbose=4)
-        gs.fit(self.data_train, self.labels_train)
+        estimator, X = model, self.data_train
+        if isinstance(model, Pipeline) and 'hog' in model.named_steps:
+            estimator, X = self.prepare_feature_store(model, param_grid)
+        
+        if search == 'halving':
+            gs = SuccessiveHalvingSearch(estimator, param_grid, n_jobs=-1, cv=3, verbose=4)
+        else:
+            gs = GridSearchCV(estimator, param_grid, n_jobs=-1, cv=3, verbose=4)
+        gs.fit(X, self.labels_train)
+
+        if estimator is not model:
+            # the saved search gets back HOGFeatures steps, with the best parameters, so that it works on images
+            stored = gs.best_estimator_.named_steps['hog']
+            params = dict((name, getattr(stored, name)) for name in ('orientations', 'pixels_per_cell', 'cells_per_block'))
+            gs.best_estimator_.steps[0] = ('hog', HOGFeatures(stored.size, **params))
+            gs.estimator = model
      
         pprint(sorted(gs.grid_scores_, key=lambda x: -x.mean_validation_score))
  
@@ -352,18 +434,54 @@ class OcrData():
      
         print "Saved model to {}".format(full_name)
 
+###############################################################################################################################
+
+    def prepare_feature_store(self, model, param_grid):
+        """
+        computes (or finds on disk) the HOG features of the train set once for every HOG configuration
+        in param_grid, so that during the grid search every fold and every C value reuses them instead
+        of transforming the raw pixels again.
+        Returns (model, X): model with its hog step replaced by a StoredHOGFeatures reading the feature
+        store, and the column of train set row indices to search on in place of the images.
+        """
+        from sklearn.grid_search import ParameterGrid
+
+        hog = model.named_steps['hog']
+        store = FeatureStore(self.feature_store)
+        fingerprint = store.fingerprint(self.data_train)
+
+        names = ('orientations', 'pixels_per_cell', 'cells_per_block')
+        configs = set()
+        for params in ParameterGrid(param_grid):
+            configs.add(tuple(params.get('hog__' + name, getattr(hog, name)) for name in names))
+
+        for orientations, pixels_per_cell, cells_per_block in sorted(configs):
+            store.get(self.data_train, orientations, pixels_per_cell, cells_per_block, hog.size, fingerprint)
+
+        print 'HOG features of {} configurations in {}: {} computed, {} read from disk'.format(
+            len(configs), self.feature_store, store.misses, store.hits)
+
+        stored = StoredHOGFeatures(store, fingerprint, hog.size,
+                                   **dict((name, getattr(hog, name)) for name in names))
+        model = Pipeline([('hog', stored)] + model.steps[1:])
+        return model, np.arange(self.data_train.shape[0])[:, np.newaxis]
+
 ###############################################################################################################################
 
     def perform_convnet(self):
         """
         trains a model on data using pre-trained NN to extract features and then using SVM with linear kernel.
         """
+        from skimage import color
+        from sklearn import cross_validation
+        from nolearn.convnet import ConvNetFeatures
+
         n_images = self.images_train.shape[0]
         print 'Preparing to turn {} to RGB.'.format(n_images)
         size = (self.img_size[0], self.img_size[1], 3)
         colored = np.zeros((n_images,) + size)
         for i in range(n_images):
-            colored[i] =  color.gray2rgb(self.images_train[i])
+            colored[i] =  color.gray2rgb(as_float(self.images_train[i]))
         print 'Turned {} images to {} shape.'.format(colored.shape[0], size)
         for c in [0.01, 0.1, 1, 2, 10]:
             print 'Fitting Pipeline (NN + SVC) C=', c
@@ -383,6 +501,7 @@ class OcrData():
         given the best parameters out of grid search returns best model on all train set using
         Pipeline(hog + linearsvc).  
         """
+        from sklearn.metrics import accuracy_score
         
         clf = Pipeline([('hog', HOGFeatures(orientations=10, pixels_per_cell=(5,5), cells_per_block=(2,2), size = self.img_size)), 
                         ('clf', LinearSVC(C=2.0))])        
@@ -401,12 +520,51 @@ class OcrData():
      
         print "Saved model to {}".format(full_name)        
         
+################################################################################################################################
+
+    def generate_streaming_hog_model(self, n_epochs=5):
+        """
+        same Pipeline(hog + linear SVM) as generate_best_hog_model, but trained out of core: the HOG features of
+        the train set are computed train_chunk_size images at a time, straight from the (memory-mapped) loaded
+        data, and fed to an SGDClassifier with hinge loss for n_epochs epochs (see streaming.train_streaming),
+        so the train set does not have to fit in memory. It does not need automatic_split.
+        The classifier is checkpointed after every epoch in folder_data, and an interrupted training resumes
+        from there (a checkpoint left by a different training is ignored). The saved model can be used by UserData like the LinearSVC ones.
+        """
+        from streaming import train_streaming, score_streaming
+
+        train, test = self.split_indices()
+        hog = HOGFeatures(orientations=10, pixels_per_cell=(5,5), cells_per_block=(2,2), size = self.img_size)
+        checkpoint = os.path.join(self.folder_data, 'sgd-hog-checkpoint.pickle')
+
+        clf = train_streaming(self.ocr['images'], self.ocr['target'], hog, train, n_epochs, self.train_chunk_size,
+                              checkpoint, verbose=self.verbose)
+
+        print 'Accuracy on train set: ', score_streaming(clf, self.ocr['images'], self.ocr['target'], train, self.train_chunk_size)
+        if test.shape[0]:
+            print 'Accuracy on test set: ', score_streaming(clf, self.ocr['images'], self.ocr['target'], test, self.train_chunk_size)
+
+        now = str(datetime.now()).replace(':','-')   
+        fname_out = 'sgd-hog-fulltrain-{}.pickle'.format(now)
+        full_name = os.path.join(self.folder_data,fname_out)
+ 
+        with open(full_name, 'wb') as fout:
+            cPickle.dump(clf, fout, -1)
+        # the next training starts from scratch
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+     
+        print "Saved model to {}".format(full_name)        
+        
 ################################################################################################################################
 
     def evaluate(self, model_filename):
         """
         Evaluates best model out of CV on test set
         """
+        from sklearn.metrics import accuracy_score, confusion_matrix
+        from matplotlib import pyplot as plt
+
         if not self.automatic_split:
             print 'Before performing any ML you should split your data!'
             print 'Change to True the automatic_split in the config file.'
@@ -417,8 +575,7 @@ class OcrData():
             print 'Thus you do not have a test set to evaluate your model on.'
             sys.exit(0)
                                
-        with open(model_filename, 'rb') as fin:
-            model = cPickle.load(fin)
+        model = load_model(model_filename)
      
         y_pred = model.predict(self.data_test)
         print 'Test set shape: ', self.data_test.shape
@@ -454,40 +611,83 @@ class OcrData():
 
 ########################################################################################################################
 
-    def merge_with_cifar(self):
+    def merge_with_cifar(self, n_text=50000):
         """
         merges ocr data with cifar data and relabels in order to perform binary classification.
-        This method is in charge of generating a unique data set merging 50000 images containing text (from the OCR data set)
-        and 50000 images not containing text (from the CIFAR-10 data set).
+        This method is in charge of generating a unique data set merging the images not containing text (from the CIFAR-10
+        data set, cifar_config) labeled 0 and n_text images containing text (from the OCR data set, text_config) labeled 1.
+        The merged, shuffled data set is only an index map over the two (see dataset.MergedDataset): its images are
+        streamed into the saved dataset folder, converted to the storage_dtype of this instance, and the returned
+        dictionary memory-maps them, so that the peak memory stays around the size of the biggest source.
         """ 
-        cifar = Cifar('/home/francesco/Dropbox/DSR/OCR/cifar-config.py')
-        
-        text = OcrData('/home/francesco/Dropbox/DSR/OCR/text-config.py')
+        from cifar import Cifar
+
+        cifar = Cifar(self.cifar_config)
         
-        text.ocr['target'][:] = 1
+        text = OcrData(self.text_config)
 
-        total = 100000
+        total = len(cifar.cif['target']) + min(n_text, len(text.ocr['target']))
         seed(10)
         k = sample(range(total), total)
-        
-        cifar_plus_text = {
-                           'images': np.concatenate((cifar.cif['images'], text.ocr['images'][:50000]))[k],
-                           'data': np.concatenate((cifar.cif['data'], text.ocr['data'][:50000]))[k],
-                           'target': np.concatenate((cifar.cif['target'], text.ocr['target'][:50000]))[k]
-                           }
+        merged = MergedDataset([(cifar.cif, None, '0'), (text.ocr, n_text, '1')], order=k)
  
         now = str(datetime.now()).replace(':','-')   
-        fname_out = 'images-{}-{}-{}.pickle'.format(cifar_plus_text['target'].shape[0], self.img_size, now)
-        full_name = os.path.join(self.folder_data,fname_out)
-        with open(full_name, 'wb') as fout:
-            cPickle.dump(cifar_plus_text, fout, -1)
+        fname_out = 'images-{}-{}-{}'.format(total, self.img_size, now)
+        full_name = merged.save(os.path.join(self.folder_data,fname_out), 'chars74k+cifar', self.storage_dtype, self.chunk_size)
             
-        return cifar_plus_text
-        
+        return load_dataset(full_name)
 
 
+
+#################################################################################################################################
+#################################################################################################################################
+#################################################################################################################################
+
+def _init_shared_images(shared, shape, dtype):
+    """
+    initializer of the load_parallel workers: wraps the shared buffer into a numpy array.
+    """
+    global _shared_images
+    _shared_images = np.frombuffer(shared, dtype=dtype).reshape(shape)
+
+
+def _load_chunk(args):
+    """
+    loads a shard of images into the shared array starting at position start.
+    Returns start and, for each image, whether it was big enough to be kept.
+    """
+    from skimage.io import imread
+    start, filenames, img_size = args
+    kept = []
+    images = []
+    for offset, filename in enumerate(filenames):
+        image = imread(filename, as_grey=True)
+        sh = image.shape
+        if ((sh[0]*sh[1]) >= (img_size[0]*img_size[1])):
+            images.append(image)
+            kept.append(True)
+        else:
+            kept.append(False)
+    offsets = start + np.flatnonzero(kept)
+    _shared_images[offsets] = resize_batch(images, img_size, dtype=_shared_images.dtype)
+    return start, kept
+
+#################################################################################################################################
 #################################################################################################################################
 #################################################################################################################################
+
+class GreyLevels(BaseEstimator):
+    """
+    first step of the models fed with raw pixels: turns the flattened images, in the dtype they are
+    stored in (see dataset.storage_dtype), into float64 grey levels in [0, 1] (see dataset.as_float),
+    so that the train and test sets are only converted where the model reads them.
+    """
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return as_float(X)
+
 #################################################################################################################################
 
 class HOGFeatures(BaseEstimator):
@@ -512,18 +712,16 @@ class HOGFeatures(BaseEstimator):
         return self
 
     def transform(self, X):
+        """
+        computes the HOG features of the whole batch of flattened images at once (see hog.batch_hog).
+        """
         X = X.reshape((X.shape[0], self.size[0], self.size[1]))
-        result = []
-        for image in X:
-            #image = rgb2gray(image)
-            features = hog(
-                image,
-                orientations=self.orientations,
-                pixels_per_cell=self.pixels_per_cell,
-                cells_per_block=self.cells_per_block,
-                )
-            result.append(features)
-        return np.array(result)
+        return batch_hog(
+            X,
+            orientations=self.orientations,
+            pixels_per_cell=self.pixels_per_cell,
+            cells_per_block=self.cells_per_block,
+            )
     
     
     
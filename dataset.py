@@ -0,0 +1,239 @@
+import os
+import json
+import cPickle
+import numpy as np
+
+IMAGES_FILE = 'images.npy'
+TARGET_FILE = 'target.npy'
+HEADER_FILE = 'header.json'
+STORAGE_DTYPES = ('float64', 'float32', 'uint8')
+
+
+def is_dataset(path):
+    """
+    tells whether path is a dataset folder written by save_dataset (as opposed to a legacy .pickle file).
+    """
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, HEADER_FILE))
+
+#######################################################################################################################
+
+def storage_dtype(name):
+    """
+    returns the numpy dtype of a storage_dtype config value: 'float64' (the default), 'float32', or 'uint8'
+    (grey levels quantized to 0..255, 8 times smaller than float64).
+    """
+    if name not in STORAGE_DTYPES:
+        raise ValueError('storage_dtype must be one of {}, got {!r}.'.format(', '.join(STORAGE_DTYPES), name))
+    return np.dtype(name)
+
+#######################################################################################################################
+
+def quantize(images, dtype):
+    """
+    returns grey-level images in [0, 1] (or uint8 images in 0..255) converted to the storage dtype:
+    uint8 levels are round(255 * value), floats keep the values. images are returned as they are
+    if they already have that dtype.
+    """
+    dtype = np.dtype(dtype)
+    images = np.asarray(images)
+    if images.dtype == dtype:
+        return images
+    if dtype == np.uint8:
+        return np.rint(images * 255.0).astype(np.uint8)
+    if images.dtype == np.uint8:
+        return (images / 255.0).astype(dtype)
+    return images.astype(dtype)
+
+#######################################################################################################################
+
+def as_float(images):
+    """
+    returns stored images as float64 grey levels in [0, 1], the input of the features: uint8 levels
+    are divided by 255, float64 images are returned as they are (no copy).
+    """
+    images = np.asarray(images)
+    if images.dtype == np.uint8:
+        return images / 255.0
+    return images.astype(np.float64, copy=False)
+
+#######################################################################################################################
+
+def save_dataset(path, images, target, source):
+    """
+    writes a dataset to the folder path (created if needed) as:
+     - images.npy --> raw (n_images x M x N) block of images, which can be memory-mapped
+     - target.npy --> compact array with the label of each image
+     - header.json --> img_size, count, dtype and source (a short description of where the data comes from)
+    The flattened data matrix is not stored since it is only a reshape of the images.
+    Returns path.
+    """
+    images = np.asarray(images)
+    target = np.asarray(target)
+    if target.dtype.kind in ('U', 'O'):
+        target = target.astype(str)
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    np.save(os.path.join(path, IMAGES_FILE), images)
+    np.save(os.path.join(path, TARGET_FILE), target)
+    _write_header(path, images, source)
+
+    return path
+
+#######################################################################################################################
+
+def _write_header(path, images, source):
+    """
+    writes the header.json of the dataset in path, whose images array is images.
+    """
+    header = {
+             'img_size': list(images.shape[1:]),
+             'count': images.shape[0],
+             'dtype': images.dtype.name,
+             'source': source,
+             }
+    with open(os.path.join(path, HEADER_FILE), 'w') as fout:
+        json.dump(header, fout, indent=4)
+
+#######################################################################################################################
+
+def load_dataset(path, limit=0):
+    """
+    opens a dataset written by save_dataset and returns the same dictionary the loaders used to unpickle:
+     - images --> read-only memory map over images.npy, nothing is read until it is accessed
+       (the images keep the dtype they were saved with, see storage_dtype)
+     - data --> (n_images x (M x N)) view of images, no copy
+     - target --> labels of each image
+    if limit != 0 only the first limit images are returned (still without copying them).
+    """
+    with open(os.path.join(path, HEADER_FILE)) as fin:
+        header = json.load(fin)
+
+    images = np.load(os.path.join(path, IMAGES_FILE), mmap_mode='r')
+    target = np.load(os.path.join(path, TARGET_FILE))
+
+    if images.shape[0] != header['count'] or images.shape[0] != target.shape[0]:
+        raise ValueError('Dataset {} is inconsistent with its header.'.format(path))
+
+    if limit != 0:
+        images = images[:limit]
+        target = target[:limit]
+
+    return {
+           'images': images,
+           'data': images.reshape((images.shape[0], -1)),
+           'target': target,
+           }
+
+#######################################################################################################################
+
+class MergedDataset():
+    """
+    dataset made of (part of) the images of several source datasets (dictionaries with images and
+    target, typically memory-mapped by load_dataset), described by an index map instead of copies:
+    image i is row rows[i] of source sources[i]. The sources are neither concatenated nor shuffled,
+    the images are only gathered when asked for (see take), chunk by chunk, or streamed to a
+    dataset folder (see save), so the peak memory does not grow with the merged dataset.
+    """
+
+    def __init__(self, parts, order=None):
+        """
+        builds the index map of parts, a list of (dataset, count, label) tuples: the first count
+        images of dataset (all of them if count is None), relabeled to label (kept as they are if
+        label is None). The images of the parts follow each other as in np.concatenate, then order
+        (a permutation of them, e.g. a shuffle) is applied to the map.
+        """
+        self.datasets = []
+        sources = []
+        rows = []
+        targets = []
+        for source, (dataset, count, label) in enumerate(parts):
+            count = len(dataset['target']) if count is None else min(count, len(dataset['target']))
+            self.datasets.append(dataset)
+            sources.append(np.repeat(source, count))
+            rows.append(np.arange(count))
+            targets.append(dataset['target'][:count] if label is None else np.repeat(label, count))
+
+        self.sources = np.concatenate(sources)
+        self.rows = np.concatenate(rows)
+        self.target = np.concatenate(targets)
+        if order is not None:
+            order = np.asarray(order)
+            self.sources = self.sources[order]
+            self.rows = self.rows[order]
+            self.target = self.target[order]
+
+#######################################################################################################################
+
+    def __len__(self):
+        return self.sources.shape[0]
+
+#######################################################################################################################
+
+    def take(self, indices, out=None, dtype=np.float64):
+        """
+        gathers the images at indices (any index array or slice of the merged dataset) into out,
+        allocated if not given, converted to its dtype (see quantize).
+        Every source is read once, in increasing row order, which is sequential on a memory map.
+        """
+        sources = self.sources[indices]
+        rows = self.rows[indices]
+        if out is None:
+            out = np.empty((sources.shape[0],) + self.datasets[0]['images'].shape[1:], dtype=dtype)
+
+        for source, dataset in enumerate(self.datasets):
+            selected = np.flatnonzero(sources == source)
+            selected = selected[np.argsort(rows[selected], kind='mergesort')]
+            if selected.size:
+                out[selected] = quantize(dataset['images'][rows[selected]], out.dtype)
+
+        return out
+
+#######################################################################################################################
+
+    def save(self, path, source, dtype=np.float64, chunk_size=10000):
+        """
+        writes the merged dataset to the folder path in the save_dataset format, streaming
+        chunk_size images at a time into the memory-mapped images.npy.
+        Returns path.
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        shape = (len(self),) + self.datasets[0]['images'].shape[1:]
+        images = np.lib.format.open_memmap(os.path.join(path, IMAGES_FILE), mode='w+', dtype=dtype, shape=shape)
+        for start in range(0, len(self), chunk_size):
+            self.take(slice(start, start + chunk_size), out=images[start:start + chunk_size])
+        images.flush()
+
+        target = self.target
+        if target.dtype.kind in ('U', 'O'):
+            target = target.astype(str)
+        np.save(os.path.join(path, TARGET_FILE), target)
+        _write_header(path, images, source)
+        del images
+
+        return path
+
+#######################################################################################################################
+
+def convert_pickle(pickle_filename, path=None):
+    """
+    converts an images-*.pickle file (dictionary with images, data and target) to the dataset format.
+    By default the dataset is written next to the pickle, in a folder with the same name without extension.
+    Returns the path of the dataset.
+    """
+    if path is None:
+        path = os.path.splitext(pickle_filename)[0]
+
+    with open(pickle_filename, 'rb') as fin:
+        dataset = cPickle.load(fin)
+
+    return save_dataset(path, dataset['images'], dataset['target'], os.path.basename(pickle_filename))
+
+
+if __name__ == '__main__':
+    import sys
+    for pickle_filename in sys.argv[1:]:
+        print 'Converted {} to {}'.format(pickle_filename, convert_pickle(pickle_filename))
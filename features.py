@@ -0,0 +1,122 @@
+import os
+import hashlib
+import numpy as np
+from sklearn.base import BaseEstimator
+from hog import batch_hog
+
+class FeatureStore():
+    """
+    content-addressed on-disk cache of HOG features.
+    The features of a dataset are keyed by a fingerprint of its pixels and by the HOG parameters
+    (orientations, pixels_per_cell, cells_per_block), saved as .npy files in folder and memory-mapped
+    when read back, so each HOG configuration is computed once per dataset, also across runs.
+    StoredHOGFeatures serves rows of a stored dataset by their index (e.g. the folds of a grid search).
+    """
+
+    def __init__(self, folder):
+        """
+        initializes the store on folder, which is created if it does not exist.
+        hits and misses count the calls to get which found the features on disk or computed them.
+        """
+        self.folder = folder
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        self.hits = 0
+        self.misses = 0
+
+#######################################################################################################################
+
+    def fingerprint(self, data):
+        """
+        returns the sha1 of the shape, type and content of data.
+        """
+        data = np.ascontiguousarray(data)
+        digest = hashlib.sha1('{}-{}'.format(data.shape, data.dtype.str))
+        digest.update(data)
+        return digest.hexdigest()
+
+#######################################################################################################################
+
+    def _filename(self, fingerprint, orientations, pixels_per_cell, cells_per_block, size):
+        """
+        returns the full name of the file holding the features of the dataset with the given fingerprint.
+        """
+        params = '{}-{}-{}-{}-{}'.format(fingerprint, orientations, tuple(pixels_per_cell), tuple(cells_per_block), tuple(size))
+        return os.path.join(self.folder, hashlib.sha1(params).hexdigest() + '.npy')
+
+#######################################################################################################################
+
+    def get(self, data, orientations, pixels_per_cell, cells_per_block, size, fingerprint=None):
+        """
+        returns the (memory-mapped) HOG features of the flattened images in data, computing and
+        saving them only if they are not in the store yet.
+        """
+        if fingerprint is None:
+            fingerprint = self.fingerprint(data)
+        filename = self._filename(fingerprint, orientations, pixels_per_cell, cells_per_block, size)
+
+        if os.path.exists(filename):
+            self.hits += 1
+        else:
+            self.misses += 1
+            features = batch_hog(
+                data.reshape((data.shape[0], size[0], size[1])),
+                orientations=orientations,
+                pixels_per_cell=pixels_per_cell,
+                cells_per_block=cells_per_block,
+                )
+            # written under a temporary name first, so that a half-written file is never read back
+            temporary = filename[:-len('.npy')] + '-{}.tmp.npy'.format(os.getpid())
+            np.save(temporary, features)
+            os.rename(temporary, filename)
+
+        return np.load(filename, mmap_mode='r')
+
+#######################################################################################################################
+
+    def load(self, fingerprint, orientations, pixels_per_cell, cells_per_block, size):
+        """
+        returns the (memory-mapped) HOG features saved by get for the dataset with the given fingerprint.
+        Raises a KeyError if they are not in the store.
+        """
+        filename = self._filename(fingerprint, orientations, pixels_per_cell, cells_per_block, size)
+        if not os.path.exists(filename):
+            raise KeyError('No HOG features for orientations={}, pixels_per_cell={}, cells_per_block={} in {}.'
+                           .format(orientations, pixels_per_cell, cells_per_block, self.folder))
+        return np.load(filename, mmap_mode='r')
+
+#######################################################################################################################
+#######################################################################################################################
+
+class StoredHOGFeatures(BaseEstimator):
+    """
+    stand-in for HOGFeatures (same size, orientations, pixels_per_cell and cells_per_block parameters, so
+    the same hog__ grid) whose input is a column of row indices into the dataset with the given
+    fingerprint instead of the images: transform returns the rows of its features in store,
+    which must have been computed beforehand with store.get.
+    """
+    def __init__(self,
+                 store,
+                 fingerprint,
+                 size,
+                 orientations=8,
+                 pixels_per_cell=(10, 10),
+                 cells_per_block=(1, 1)):
+
+        super(StoredHOGFeatures, self).__init__()
+        self.store = store
+        self.fingerprint = fingerprint
+        self.size = size
+        self.orientations = orientations
+        self.pixels_per_cell = pixels_per_cell
+        self.cells_per_block = cells_per_block
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        """
+        returns the stored HOG features of the rows whose indices are in the first column of X.
+        """
+        features = self.store.load(self.fingerprint, self.orientations, self.pixels_per_cell, self.cells_per_block, self.size)
+        return features[np.asarray(X)[:, 0].astype(np.intp)]
@@ -0,0 +1,92 @@
+import numpy as np
+from scipy.ndimage import uniform_filter
+from dataset import as_float
+
+
+def batch_hog(images, orientations=9, pixels_per_cell=(8, 8), cells_per_block=(3, 3), chunk_size=4096):
+    """
+    computes the Histogram of Oriented Gradients of a whole (n_images x M x N) stack of grey-level images.
+    Every stage of skimage.feature.hog (gradients, orientation binning, cell histograms and block
+    normalisation) is run as an array operation over the stack instead of once per image, and the
+    returned (n_images x n_features) matrix is the same, value by value, as stacking the per-image hog
+    of skimage 0.10 (see tests/test_hog.py).
+    The images are processed chunk_size at a time to bound the size of the temporary arrays, and
+    every chunk writes straight into the preallocated output.
+    """
+    images = np.asarray(images)
+    if images.ndim != 3:
+        raise ValueError('Expected a (n_images x M x N) stack of grey-level images.')
+
+    n_images, sy, sx = images.shape
+    cx, cy = pixels_per_cell
+    bx, by = cells_per_block
+
+    n_cellsx = sx // cx
+    n_cellsy = sy // cy
+    n_blocksx = (n_cellsx - bx) + 1
+    n_blocksy = (n_cellsy - by) + 1
+    block_shape = (n_blocksy, n_blocksx, by, bx, orientations)
+    if min(block_shape) < 0:
+        raise ValueError('cells_per_block {} does not fit in {} cells.'.format(cells_per_block, (n_cellsy, n_cellsx)))
+
+    features = np.empty((n_images, int(np.prod(block_shape))))
+
+    for start in range(0, n_images, chunk_size):
+        stop = min(start + chunk_size, n_images)
+        histogram = _orientation_histogram(images[start:stop], orientations, (cy, cx), (n_cellsy, n_cellsx))
+        out = features[start:stop].reshape((stop - start,) + block_shape)
+        _normalise_blocks(histogram, (by, bx), out)
+
+    return features
+
+#######################################################################################################################
+
+def _orientation_histogram(images, orientations, cell, n_cells):
+    """
+    returns the (n_images x n_cellsy x n_cellsx x orientations) cell histograms of a chunk of images.
+    Gradients are forward differences and each cell holds the mean magnitude of the pixels whose
+    orientation falls in the bin, exactly as in skimage.feature.hog.
+    """
+    cy, cx = cell
+    n_cellsy, n_cellsx = n_cells
+
+    # the stored images (float32 or uint8, see dataset.storage_dtype) become float64 here, one chunk at a time
+    images = as_float(images)
+
+    gx = np.zeros(images.shape)
+    gy = np.zeros(images.shape)
+    gx[:, :, :-1] = np.diff(images, n=1, axis=2)
+    gy[:, :-1, :] = np.diff(images, n=1, axis=1)
+
+    magnitude = np.sqrt(gx**2 + gy**2)
+    orientation = np.arctan2(gy, gx) * (180 / np.pi) % 180
+    del gx, gy
+
+    histogram = np.empty((images.shape[0], n_cellsy, n_cellsx, orientations))
+    subsample = np.index_exp[:, cy // 2:cy * n_cellsy:cy, cx // 2:cx * n_cellsx:cx]
+    for i in range(orientations):
+        in_bin = (orientation < 180.0 / orientations * (i + 1)) & (orientation >= 180.0 / orientations * i)
+        # a size of 1 along the stack axis keeps the filter inside each image
+        temp_filt = uniform_filter(np.where(in_bin, magnitude, 0), size=(1, cy, cx))
+        histogram[..., i] = temp_filt[subsample]
+
+    return histogram
+
+#######################################################################################################################
+
+def _normalise_blocks(histogram, block, out):
+    """
+    normalises every block of cells of a chunk of images writing into out, a
+    (n_images x n_blocksy x n_blocksx x by x bx x orientations) view of the output features.
+    The block sum is taken over the flattened block and squared with np.power so that the
+    arithmetic matches the scalar operations of the per-image hog.
+    """
+    by, bx = block
+    n_images, n_blocksy, n_blocksx = out.shape[:3]
+    eps = 1e-5
+
+    for y in range(n_blocksy):
+        for x in range(n_blocksx):
+            cells = histogram[:, y:y + by, x:x + bx, :]
+            total = cells.reshape((n_images, -1)).sum(axis=1)
+            out[:, y, x] = cells / np.sqrt(np.power(total, 2.0) + eps)[:, None, None, None]
@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+IMAGES_FILE = 'images.bin'
+INDEX_FILE = 'index.json'
+
+
+def _sha1(filename):
+    """
+    returns the sha1 of the content of filename.
+    """
+    with open(filename, 'rb') as fin:
+        return hashlib.sha1(fin.read()).hexdigest()
+
+#######################################################################################################################
+
+class ImageStore():
+    """
+    append-only on-disk store of resized images, so that rebuilding a dataset only decodes the image
+    files which are new or changed since the last build.
+    The folder holds:
+     - images.bin --> the resized images, one raw img_size block of dtype after the other
+     - index.json --> img_size, dtype, the number of rows in images.bin and, for every image file
+       (keyed by its path relative to the data folder), its mtime, size, sha1 and row (-1 for the
+       images too small to be kept)
+    An image whose mtime and size did not change is not read at all; if they changed but the sha1
+    did not (e.g. a copy or a touch) only the index is updated. Changed images are appended as new
+    rows, their old rows stay in images.bin unused: delete the folder to rebuild it from scratch.
+    """
+
+    def __init__(self, folder, img_size, dtype):
+        """
+        opens the store in folder, created if needed. A store built with another img_size or dtype
+        is started again from scratch.
+        """
+        self.folder = folder
+        self.img_size = tuple(img_size)
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = int(np.prod(self.img_size)) * self.dtype.itemsize
+        self.reused = 0
+        self.decoded = 0
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+        self.rows = 0
+        self.files = {}
+        index = os.path.join(folder, INDEX_FILE)
+        if os.path.exists(index):
+            with open(index) as fin:
+                header = json.load(fin)
+            if tuple(header['img_size']) == self.img_size and header['dtype'] == self.dtype.name:
+                self.rows = header['rows']
+                self.files = header['files']
+
+        # drops whatever an interrupted update appended after the last saved index
+        with open(os.path.join(folder, IMAGES_FILE), 'ab') as fout:
+            fout.truncate(self.rows * self.row_bytes)
+
+#######################################################################################################################
+
+    def images(self):
+        """
+        returns a read-only memory map over all the rows of images.bin.
+        """
+        if self.rows == 0:
+            return np.empty((0,) + self.img_size, dtype=self.dtype)
+        return np.memmap(os.path.join(self.folder, IMAGES_FILE), dtype=self.dtype, mode='r',
+                         shape=(self.rows,) + self.img_size)
+
+#######################################################################################################################
+
+    def _save_index(self):
+        """
+        writes index.json, through a temporary file so that an interrupted write leaves the previous index.
+        """
+        header = {
+                 'img_size': list(self.img_size),
+                 'dtype': self.dtype.name,
+                 'rows': self.rows,
+                 'files': self.files,
+                 }
+        temporary = os.path.join(self.folder, INDEX_FILE + '.tmp')
+        with open(temporary, 'w') as fout:
+            json.dump(header, fout)
+        os.rename(temporary, os.path.join(self.folder, INDEX_FILE))
+
+#######################################################################################################################
+
+    def update(self, folder_data, complete, read_images, batch_size=1000):
+        """
+        given the (relative path, label) couples of the images (paths without the .png extension, as
+        returned by OcrData.getRelativePath), decodes and appends to the store the images which are new
+        or changed, batch_size at a time, with read_images(couples) --> (resized images kept, kept mask),
+        e.g. OcrData.read_images. The index is saved after every batch, so an interrupted build resumes
+        where it stopped.
+        Returns (images, kept): the resized images kept, in the order of complete, and the kept mask.
+        """
+        todo = []
+        touched = False
+        for couple in complete:
+            filename = os.path.join(folder_data, couple[0] + '.png')
+            stat = os.stat(filename)
+            entry = self.files.get(couple[0])
+            if entry is not None and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                continue
+            digest = _sha1(filename)
+            if entry is not None and entry['sha1'] == digest:
+                entry['mtime'], entry['size'] = stat.st_mtime, stat.st_size
+                touched = True
+                continue
+            todo.append((couple, {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': digest}))
+
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            images, kept = read_images([couple for couple, _ in batch])
+            with open(os.path.join(self.folder, IMAGES_FILE), 'ab') as fout:
+                fout.write(np.ascontiguousarray(images, dtype=self.dtype).tobytes())
+            rows = self.rows + np.cumsum(kept) - 1
+            for (couple, entry), is_kept, row in zip(batch, kept, rows):
+                entry['row'] = int(row) if is_kept else -1
+                self.files[couple[0]] = entry
+            self.rows += int(np.sum(kept))
+            self._save_index()
+        if touched:
+            self._save_index()
+
+        self.decoded = len(todo)
+        self.reused = len(complete) - len(todo)
+        rows = np.array([self.files[couple[0]]['row'] for couple in complete], dtype=int)
+        kept = rows >= 0
+        return self.images()[rows[kept]], kept
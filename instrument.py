@@ -0,0 +1,148 @@
+import json
+from collections import OrderedDict
+from timeit import default_timer
+
+STAGES = ['load', 'denoise', 'threshold', 'label', 'crop_resize', 'hog', 'text_filter', 'classify']
+
+class Instruments():
+    """
+    collects, for every stage of the OCR pipeline (see STAGES), the number of calls, the wall time,
+    the number of items processed (images, pixels or candidates) and the bytes of the arrays the
+    stage allocated for its output.
+    Every measure is also passed to the hooks, callables taking (stage, seconds, items, nbytes).
+    The stages of a UserData are only measured if it was given instruments: otherwise stage()
+    returns a shared object doing nothing, so that the pipeline pays one function call per stage.
+    """
+
+    def __init__(self, hooks=()):
+        """
+        initializes empty counters and the list of hooks.
+        """
+        self.hooks = list(hooks)
+        self.stages = OrderedDict()
+
+#######################################################################################################################
+
+    def record(self, stage, seconds, items=0, nbytes=0):
+        """
+        adds a measure of stage to the counters and passes it to the hooks.
+        """
+        counters = self.stages.setdefault(stage, _counters())
+        counters['calls'] += 1
+        counters['seconds'] += seconds
+        counters['items'] += items
+        counters['bytes'] += nbytes
+        for hook in self.hooks:
+            hook(stage, seconds, items, nbytes)
+
+#######################################################################################################################
+
+    def merge(self, stages):
+        """
+        adds the counters of another Instruments (its stages attribute, e.g. sent back by a worker
+        process) to these ones. The hooks are not called.
+        """
+        for stage, other in stages.items():
+            counters = self.stages.setdefault(stage, _counters())
+            for key in counters:
+                counters[key] += other[key]
+
+#######################################################################################################################
+
+    def to_json(self):
+        """
+        returns the counters as a JSON object, {stage: {calls, seconds, items, bytes}}.
+        """
+        return json.dumps(self.stages, indent=2)
+
+#######################################################################################################################
+
+    def to_prometheus(self, prefix='ocr_stage'):
+        """
+        returns the counters in the Prometheus text exposition format, one counter per measure
+        labeled by stage.
+        """
+        lines = []
+        for key in ('calls', 'seconds', 'items', 'bytes'):
+            name = '{}_{}_total'.format(prefix, key)
+            lines.append('# TYPE {} counter'.format(name))
+            for stage, counters in self.stages.items():
+                lines.append('{}{{stage="{}"}} {}'.format(name, stage, repr(counters[key])))
+        return '\n'.join(lines) + '\n'
+
+#######################################################################################################################
+
+    def dump(self, filename):
+        """
+        writes the counters to filename, in the Prometheus text format if it ends with .prom,
+        as JSON otherwise.
+        """
+        with open(filename, 'w') as fout:
+            fout.write(self.to_prometheus() if filename.endswith('.prom') else self.to_json())
+
+#######################################################################################################################
+
+class Stage():
+    """
+    context manager measuring the wall time of a stage; the code of the stage reports the items
+    it processed and the bytes it allocated with done.
+    """
+
+    def __init__(self, instruments, name):
+        """
+        initializes the measure of stage name.
+        """
+        self.instruments = instruments
+        self.name = name
+        self.items = 0
+        self.nbytes = 0
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.instruments.record(self.name, default_timer() - self.start, self.items, self.nbytes)
+        return False
+
+    def done(self, items=0, nbytes=0):
+        """
+        sets the items processed and the bytes allocated by the stage.
+        """
+        self.items = items
+        self.nbytes = nbytes
+
+#######################################################################################################################
+
+class _Disabled():
+    """
+    stand-in for Stage when there are no instruments.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def done(self, items=0, nbytes=0):
+        pass
+
+
+def _counters():
+    """
+    returns the zeroed counters of a stage.
+    """
+    return OrderedDict([('calls', 0), ('seconds', 0.0), ('items', 0), ('bytes', 0)])
+
+
+_disabled = _Disabled()
+
+def stage(instruments, name):
+    """
+    returns the context manager measuring stage name with instruments, if any (None --> nothing is measured).
+    """
+    if instruments is None:
+        return _disabled
+    return Stage(instruments, name)
@@ -0,0 +1,165 @@
+import os
+import cPickle
+import numpy as np
+from hog import batch_hog
+
+class HOG():
+    """
+    HOG transform with the same parameters and output as the HOGFeatures step of a pickled model,
+    without depending on scikit-learn.
+    """
+
+    def __init__(self, size, orientations, pixels_per_cell, cells_per_block):
+        """
+        initializes the transform with the parameters of a HOGFeatures step.
+        """
+        self.size = size
+        self.orientations = orientations
+        self.pixels_per_cell = pixels_per_cell
+        self.cells_per_block = cells_per_block
+
+    def transform(self, X):
+        """
+        computes the HOG features of the flattened images in X.
+        """
+        X = X.reshape((X.shape[0], self.size[0], self.size[1]))
+        return batch_hog(
+            X,
+            orientations=self.orientations,
+            pixels_per_cell=self.pixels_per_cell,
+            cells_per_block=self.cells_per_block,
+            )
+
+#######################################################################################################################
+
+class LinearClassifier():
+    """
+    prediction side of a fitted LinearSVC: one matrix product with coef_, plus intercept_,
+    then the best class (or the sign of the score for two classes), exactly as LinearSVC.predict.
+    """
+
+    def __init__(self, coef, intercept, classes):
+        """
+        initializes the classifier with the coef_, intercept_ and classes_ of a LinearSVC.
+        """
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+
+    def decision_function(self, features):
+        """
+        returns the score of every class (a single score if there are two classes).
+        """
+        scores = np.dot(features, self.coef_.T) + self.intercept_
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, features):
+        """
+        returns the predicted class of each row of features.
+        """
+        scores = self.decision_function(features)
+        if scores.ndim == 1:
+            indices = (scores > 0).astype(np.intp)
+        else:
+            indices = scores.argmax(axis=1)
+        return self.classes_[indices]
+
+#######################################################################################################################
+
+class LinearHOGModel():
+    """
+    lightweight replacement of a pickled Pipeline(hog + LinearSVC) model, loaded from the .npz
+    written by export_model. It predicts the same classes as the original model, from the
+    flattened images, using only numpy and scipy. Like a Pipeline it has steps, so that UserData
+    can share its HOG features with another model.
+    """
+
+    def __init__(self, hog, clf):
+        """
+        initializes the model with its HOG and LinearClassifier steps.
+        """
+        self.steps = [('hog', hog), ('clf', clf)]
+
+    @staticmethod
+    def load(filename):
+        """
+        loads a model saved by export_model.
+        """
+        params = np.load(filename)
+        hog = HOG(
+            size=tuple(params['size']),
+            orientations=int(params['orientations']),
+            pixels_per_cell=tuple(params['pixels_per_cell']),
+            cells_per_block=tuple(params['cells_per_block']),
+            )
+        return LinearHOGModel(hog, LinearClassifier(params['coef'], params['intercept'], params['classes']))
+
+    def predict(self, X):
+        """
+        predicts the class of each flattened image in X.
+        """
+        return self.steps[1][1].predict(self.steps[0][1].transform(X))
+
+    def decision_function(self, X):
+        """
+        returns the scores of the classes (see LinearClassifier.decision_function) of each flattened image in X.
+        """
+        return self.steps[1][1].decision_function(self.steps[0][1].transform(X))
+
+#######################################################################################################################
+
+def export_model(model_filename, npz_filename=None, check_data=None):
+    """
+    extracts coef_, intercept_, classes_ and the HOG parameters of a pickled Pipeline(hog + LinearSVC)
+    into a compact .npz file (by default next to the pickle) which LinearHOGModel.load reads.
+    If check_data (flattened images) is given, it also checks that the exported model predicts
+    exactly what the pickled one does, with the same decision_function, and raises a ValueError
+    otherwise. Returns the name of the .npz file.
+    """
+    if npz_filename is None:
+        npz_filename = os.path.splitext(model_filename)[0] + '.npz'
+
+    with open(model_filename, 'rb') as fin:
+        model = cPickle.load(fin)
+    hog, clf = model.steps[0][1], model.steps[-1][1]
+    # models pickled with old scikit-learn versions keep their classes in a label encoder
+    classes = clf.classes_ if hasattr(clf, 'classes_') else clf._enc.classes_
+
+    np.savez(
+        npz_filename,
+        coef=clf.coef_,
+        intercept=clf.intercept_,
+        classes=classes,
+        size=hog.size,
+        orientations=hog.orientations,
+        pixels_per_cell=hog.pixels_per_cell,
+        cells_per_block=hog.cells_per_block,
+        )
+
+    if check_data is not None:
+        exported = LinearHOGModel.load(npz_filename)
+        if not (np.array_equal(exported.predict(check_data), model.predict(check_data)) and
+                np.array_equal(exported.decision_function(check_data), model.decision_function(check_data))):
+            raise ValueError('The model exported to {} does not predict as {}.'.format(npz_filename, model_filename))
+
+    return npz_filename
+
+
+def check_sample(model_filename, n_images=1000):
+    """
+    returns n_images flattened synthetic glyphs (see benchmark.synthetic_glyphs) of the size of the
+    images of the pickled model, to check its export on.
+    """
+    from benchmark import synthetic_glyphs
+
+    with open(model_filename, 'rb') as fin:
+        size = cPickle.load(fin).steps[0][1].size
+    images, _ = synthetic_glyphs(n_images, size=size)
+    return images.reshape((n_images, -1))
+
+
+if __name__ == '__main__':
+    import sys
+    for model_filename in sys.argv[1:]:
+        npz_filename = export_model(model_filename, check_data=check_sample(model_filename))
+        print 'Exported {} to {} (same predictions on a synthetic sample)'.format(model_filename, npz_filename)
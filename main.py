@@ -1,4 +1,5 @@
 from userimageski import UserData
+from models import registry
 
 if __name__ == '__main__':
    
@@ -9,6 +10,10 @@ if __name__ == '__main__':
     ##### just for the purpose of clearness below the code is provided. 
     ##### I want to emphasize that the commented code is the one necessary to get the models trained.
     
+    text_model = '/media/francesco/Francesco/CharacterProject/linearsvc-hog-fulltrain2-90.pickle'
+    char_model = '/media/francesco/Francesco/CharacterProject/linearsvc-hog-fulltrain36-90.pickle'
+    # loads both models once, every following prediction reuses them
+    registry.warm_up([text_model, char_model])
     # creates instance of class and loads image    
     user = UserData('lao.jpg')
     # plots preprocessed imae 
@@ -18,11 +23,11 @@ if __name__ == '__main__':
     # plots objects detected
     user.plot_to_check(candidates, 'Total Objects Detected')
     # selects objects containing text
-    maybe_text = user.select_text_among_candidates('/media/francesco/Francesco/CharacterProject/linearsvc-hog-fulltrain2-90.pickle')
+    maybe_text = user.select_text_among_candidates(text_model)
     # plots objects after text detection
     user.plot_to_check(maybe_text, 'Objects Containing Text Detected')
     # classifies single characters
-    classified = user.classify_text('/media/francesco/Francesco/CharacterProject/linearsvc-hog-fulltrain36-90.pickle')
+    classified = user.classify_text(char_model)
     # plots letters after classification 
     user.plot_to_check(classified, 'Single Character Recognition')
     # plots the realigned text
@@ -0,0 +1,96 @@
+import os
+import string
+from glob import glob
+from itertools import chain, takewhile
+import numpy as np
+
+# folder of the images listed by each Chars74K manifest, found by the dataset name in the manifest filename
+PREFIXES = [
+           ('Img', ['Englishimg', 'Img']),
+           ('Fnt', ['EnglishFnt', 'Fnt']),
+           ('Hnd', ['EnglishHnd', 'Hnd']),
+           ]
+
+# the 62 classes (1-62) with lowercase and uppercase letters merged: '0'-'9', then 'a'-'z' twice
+CLASSES = dict(zip(range(1, 63), map(str, range(10)) + list(string.ascii_lowercase) + list(string.ascii_lowercase)))
+
+
+def parse_manifest(mfile, tables=None):
+    """
+    reads a Chars74K list_English_*.m file line by line, in a single pass, and yields the
+    (relative path, label) record of every image it lists, the path being relative to the data folder
+    (without extension) and the label one of the 36 classes of CLASSES.
+    The labels (list.ALLlabels) come before the names (list.ALLnames) in the file: they are kept as
+    small integers until the names stream by. If tables (a dictionary) is given, the class table
+    (list.classlabels and list.classnames) is stored in it as classlabels and classnames.
+    """
+    prefix = [folders for name, folders in PREFIXES if name in os.path.basename(mfile)][0]
+    folder = os.path.join(*prefix) + os.sep
+    labels = []
+    with open(mfile) as m:
+        for line in m:
+            if not line.startswith('list.'):
+                continue
+            name, _, value = line.partition(' = ')
+            section = name[len('list.'):]
+            if section == 'ALLlabels':
+                labels = [int(line.strip()[:-1]) for line in _section(value, m)]
+            elif section == 'ALLnames':
+                for position, line in enumerate(_section(value, m)):
+                    if position == len(labels):
+                        raise ValueError('{} lists more names than labels.'.format(mfile))
+                    yield folder + line.strip()[1:-1].replace('/', os.sep), CLASSES[labels[position]]
+            elif section == 'classlabels' and tables is not None:
+                tables[section] = [int(line.strip()[:-1]) for line in _section(value, m)]
+            elif section == 'classnames' and tables is not None:
+                tables[section] = [line.strip()[1:-1] for line in _section(value, m)]
+
+#######################################################################################################################
+
+def _section(value, lines):
+    """
+    returns an iterator over the lines of a section of a .m file, starting with value (what follows
+    ' = ' on the first line) without its opening bracket and reading lines up to the closing one.
+    """
+    return takewhile(lambda line: not line.startswith(']'), chain([value[1:]], lines))
+
+#######################################################################################################################
+
+def _stamps(mfiles):
+    """
+    returns the (mtime, size) of every file of mfiles.
+    """
+    return np.array([(stat.st_mtime, stat.st_size) for stat in map(os.stat, mfiles)], dtype=float).reshape((-1, 2))
+
+#######################################################################################################################
+
+def load_manifests(folder_labels, cache=None):
+    """
+    returns (paths, labels), the records of all the .m manifests in folder_labels (see parse_manifest),
+    in the order glob lists the manifests.
+    If cache is given (an .npz filename) the records are saved there as compact string arrays, with
+    the names, mtimes and sizes of the manifests, and read back from it as long as none of them changed.
+    """
+    mfiles = glob(os.path.join(folder_labels, '*.m'))
+    stamps = _stamps(mfiles)
+
+    if cache is not None and os.path.exists(cache):
+        with np.load(cache) as cached:
+            if cached['files'].tolist() == mfiles and np.array_equal(cached['stamps'], stamps):
+                return cached['paths'].tolist(), cached['labels'].tolist()
+
+    paths = []
+    labels = []
+    for mfile in mfiles:
+        for path, label in parse_manifest(mfile):
+            paths.append(path)
+            labels.append(label)
+
+    if cache is not None:
+        temporary = cache + '.tmp'
+        with open(temporary, 'wb') as fout:
+            np.savez(fout, files=np.array(mfiles, dtype=str), stamps=stamps, paths=np.array(paths, dtype=str),
+                     labels=np.array(labels, dtype=str))
+        os.rename(temporary, cache)
+
+    return paths, labels
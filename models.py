@@ -0,0 +1,137 @@
+import os
+import cPickle
+import threading
+import numpy as np
+from collections import OrderedDict
+from linear import LinearHOGModel
+
+class ModelRegistry():
+    """
+    process-wide cache of the pickled models used for prediction.
+    Models are keyed by their absolute path and modification time, so a model is unpickled only
+    the first time it is requested (or after the file on disk changes). Once more than max_models
+    models are loaded the least recently used one is dropped.
+    Besides pickles, the registry loads the .npz models written by linear.export_model,
+    which predict without scikit-learn.
+    """
+
+    def __init__(self, max_models=4):
+        """
+        initializes an empty registry holding at most max_models models.
+        """
+        self.max_models = max_models
+        self.models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+#######################################################################################################################
+
+    def get(self, model_filename):
+        """
+        returns the model saved in model_filename, unpickling it only if it is not already
+        in the registry or if the file has been modified since it was loaded.
+        """
+        path = os.path.abspath(model_filename)
+        mtime = os.path.getmtime(path)
+
+        with self._lock:
+            if path in self.models and self.models[path][0] == mtime:
+                self.hits += 1
+                model = self.models.pop(path)[1]
+                self.models[path] = (mtime, model)
+                return model
+            self.misses += 1
+
+        if path.endswith('.npz'):
+            model = LinearHOGModel.load(path)
+        else:
+            with open(path, 'rb') as fin:
+                model = cPickle.load(fin)
+
+        with self._lock:
+            self.models.pop(path, None)
+            self.models[path] = (mtime, model)
+            while len(self.models) > self.max_models:
+                self.models.popitem(last=False)
+
+        return model
+
+#######################################################################################################################
+
+    def warm_up(self, model_filenames):
+        """
+        loads all the given models in advance, so that the first prediction does not pay
+        for the unpickling. Returns the list of loaded models.
+        """
+        return [self.get(model_filename) for model_filename in model_filenames]
+
+#######################################################################################################################
+
+    def clear(self):
+        """
+        drops every loaded model and resets the hit/miss counters.
+        """
+        with self._lock:
+            self.models.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+registry = ModelRegistry()
+
+def load_model(model_filename):
+    """
+    returns the model saved in model_filename from the process-wide registry.
+    """
+    return registry.get(model_filename)
+
+#######################################################################################################################
+
+def hog_step(model):
+    """
+    returns the HOGFeatures step of a Pipeline(hog + classifier) model, None for any other model.
+    """
+    steps = getattr(model, 'steps', None)
+    if steps and steps[0][0] == 'hog':
+        return steps[0][1]
+    return None
+
+#######################################################################################################################
+
+def hog_params(hog):
+    """
+    returns the parameters which determine the features computed by a HOGFeatures step.
+    Two models whose HOG steps have the same hog_params can share the same features.
+    """
+    return (hog.orientations, tuple(hog.pixels_per_cell), tuple(hog.cells_per_block), tuple(hog.size))
+
+#######################################################################################################################
+
+def predict_from_hog(model, features):
+    """
+    predicts with a Pipeline(hog + classifier) model starting from features already computed
+    by a HOG step with the same hog_params, skipping the model's own HOG transform.
+    """
+    for name, step in model.steps[1:-1]:
+        features = step.transform(features)
+    return model.steps[-1][1].predict(features)
+
+#######################################################################################################################
+
+def decision_from_hog(model, features):
+    """
+    same as predict_from_hog, but returns the decision_function of the final classifier.
+    """
+    for name, step in model.steps[1:-1]:
+        features = step.transform(features)
+    return model.steps[-1][1].decision_function(features)
+
+#######################################################################################################################
+
+def confidence(scores):
+    """
+    given the decision_function of a classifier, returns the score of the predicted class of each row:
+    the highest score, or the absolute value of the single score of a two-class classifier.
+    """
+    return np.abs(scores) if scores.ndim == 1 else scores.max(axis=1)
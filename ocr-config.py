@@ -8,5 +8,8 @@
      'limit': 0,
      'automatic_split': True,
      'plot_evaluation': True,
-     'percentage_of_test_set': 0.10
+     'percentage_of_test_set': 0.10,
+     'stratify': False,
+     'n_jobs': -1,
+     'chunk_size': 1000
 }
@@ -0,0 +1,36 @@
+import numpy as np
+from userimageski import UserData
+
+def stream_text(images, model_filename2, model_filename36, working_size=None, instruments=None):
+    """
+    generator running the whole OCR pipeline on every image of an iterable, one image at a time.
+    images can contain paths to image files or images already loaded as numpy arrays, and can be
+    itself a generator (e.g. over the files of a directory) since it is consumed lazily.
+    For each image it runs the UserData stages (preprocess --> text candidates --> text/no-text
+    filter --> character classification) and yields a dictionary with:
+     - source --> the path of the image or its position in images if it was passed as an array
+     - predicted_char --> the characters recognized in the image
+     - coordinates --> the bounding box (minr, minc, maxr, maxc) of each character
+     - score --> the score of each character (see models.confidence)
+    Every intermediate array is released as soon as the stage that needs it is over, so memory
+    does not grow with the number of processed images.
+    working_size is passed to UserData (preprocessing of big images at a lower resolution), and so
+    are instruments (an instrument.Instruments measuring the stages of every image).
+    """
+    for index, image in enumerate(images):
+        source = index if isinstance(image, np.ndarray) else image
+        user = UserData(image, verbose=False, working_size=working_size, instruments=instruments)
+        user.get_text_candidates()
+        del user.bw
+        user.select_text_among_candidates(model_filename2)
+        del user.image, user.candidates
+        which_text = user.classify_text(model_filename36)
+        del user.to_be_classified
+
+        yield {
+              'source': source,
+              'predicted_char': which_text['predicted_char'],
+              'coordinates': which_text['coordinates'],
+              'score': which_text['score'],
+              }
+        del user, which_text
@@ -0,0 +1,63 @@
+import numpy as np
+from skimage import img_as_float
+from skimage.transform import AffineTransform
+from dataset import quantize
+
+def interpolation_grid(shape, output_shape):
+    """
+    returns, for resizing an image of the given shape to output_shape, the (output rows x output cols)
+    arrays of the four source pixels around each output pixel (rows and columns shifted by one, to
+    index the image padded with a border of zeros) and of the bilinear weights between them.
+    The source positions come from the same AffineTransform, applied with the same operations, as in
+    skimage.transform.resize, so that the interpolated values are the same bit by bit.
+    """
+    rows, cols = output_shape
+    row_scale = float(shape[0]) / rows
+    col_scale = float(shape[1]) / cols
+    src_corners = np.array([[1, 1], [1, rows], [cols, rows]]) - 1
+    dst_corners = np.zeros(src_corners.shape, dtype=np.double)
+    dst_corners[:, 0] = col_scale * (src_corners[:, 0] + 0.5) - 0.5
+    dst_corners[:, 1] = row_scale * (src_corners[:, 1] + 0.5) - 0.5
+    tform = AffineTransform()
+    tform.estimate(src_corners, dst_corners)
+    H = tform.params.astype(np.double).ravel()
+
+    y, x = np.mgrid[:rows, :cols].astype(np.double)
+    z = H[6] * x + H[7] * y + H[8]
+    c = (H[0] * x + H[1] * y + H[2]) / z
+    r = (H[3] * x + H[4] * y + H[5]) / z
+    minr, maxr = np.floor(r), np.ceil(r)
+    minc, maxc = np.floor(c), np.ceil(c)
+    return (
+           minr.astype(int) + 1, maxr.astype(int) + 1, minc.astype(int) + 1, maxc.astype(int) + 1,
+           r - minr, c - minc,
+           )
+
+#######################################################################################################################
+
+def resize_batch(images, output_shape=(20, 20), dtype=np.float32, out=None):
+    """
+    resizes a list of grey-level images of any size to output_shape and returns them stacked in a
+    (n_images x output_shape) array of dtype (or in out, if given).
+    Each image is resampled exactly as skimage.transform.resize(image, output_shape) does (bilinear,
+    zeros outside the image, integer images scaled to [0, 1] first, output clipped to [0, 1]), but
+    all the images of the same shape are resampled together, with the interpolation grid of their
+    shape computed once per call (see interpolation_grid).
+    With a uint8 dtype the resized values are quantized to 0..255 (see dataset.quantize).
+    """
+    if out is None:
+        out = np.empty((len(images),) + tuple(output_shape), dtype=dtype)
+
+    groups = {}
+    for index, image in enumerate(images):
+        groups.setdefault((image.shape, image.dtype), []).append(index)
+
+    for (shape, _), indices in groups.items():
+        minr, maxr, minc, maxc, dr, dc = interpolation_grid(shape, output_shape)
+        stack = np.zeros((len(indices), shape[0] + 2, shape[1] + 2))
+        stack[:, 1:-1, 1:-1] = img_as_float(np.array([images[index] for index in indices]))
+        top = (1 - dc) * stack[:, minr, minc] + dc * stack[:, minr, maxc]
+        bottom = (1 - dc) * stack[:, maxr, minc] + dc * stack[:, maxr, maxc]
+        out[indices] = quantize(np.clip((1 - dr) * top + dr * bottom, 0, 1), out.dtype)
+
+    return out
@@ -0,0 +1,101 @@
+from collections import namedtuple
+import numpy as np
+from sklearn.base import clone
+from sklearn.cross_validation import StratifiedKFold
+from sklearn.externals.joblib import Parallel, delayed
+from sklearn.grid_search import ParameterGrid
+
+ScoreTuple = namedtuple('ScoreTuple', ('parameters', 'mean_validation_score', 'cv_validation_scores', 'n_samples'))
+
+class SuccessiveHalvingSearch():
+    """
+    drop-in alternative to GridSearchCV (same estimator/param_grid input, same fit interface and
+    grid_scores_, best_params_, best_score_, best_estimator_ output) which does not train every
+    candidate on the whole train set.
+    All candidates are cross-validated on a small subsample of the data, the best half is kept and
+    evaluated again on a subsample twice as big, and so on until the last two candidates are compared
+    on the whole train set. The subsamples are nested, drawn from a single permutation seeded with
+    random_state.
+    As scores on subsamples of different sizes cannot be compared, grid_scores_ only holds the candidates
+    of the last round; rounds_ holds the (n_samples, scores) of every round.
+    Every candidate is fitted from scratch: LinearSVC (liblinear) cannot start from the solution of a
+    neighbouring C value.
+    """
+
+    def __init__(self, estimator, param_grid, cv=3, min_samples=100, n_jobs=1, random_state=10, verbose=0):
+        """
+        initializes the search, parameters are the ones of GridSearchCV plus:
+        - min_samples --> smallest subsample used in the first round
+        - random_state --> seed of the permutation the subsamples are taken from
+        """
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.min_samples = min_samples
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+
+#######################################################################################################################
+
+    def fit(self, X, y):
+        """
+        runs the successive halving rounds and refits the best candidate on the whole (X, y).
+        """
+        y = np.asarray(y)
+        n_samples = X.shape[0]
+        candidates = list(ParameterGrid(self.param_grid))
+        n_rounds = max(int(np.ceil(np.log2(len(candidates)))), 1)
+        order = np.random.RandomState(self.random_state).permutation(n_samples)
+
+        self.rounds_ = []
+        for i in range(n_rounds):
+            size = min(n_samples, max(self.min_samples, n_samples // 2**(n_rounds - 1 - i)))
+            subset = np.sort(order[:size])
+            if self.verbose:
+                print 'Round {}: {} candidates on {} samples'.format(i + 1, len(candidates), size)
+
+            results = self._evaluate(candidates, X[subset], y[subset])
+            scores = [ScoreTuple(params, np.mean(cv_scores), cv_scores, size) for params, cv_scores in results]
+            self.rounds_.append((size, scores))
+
+            scores = sorted(scores, key=lambda score: -score.mean_validation_score)
+            candidates = [score.parameters for score in scores[:int(np.ceil(len(scores) / 2.0))]]
+
+        self.grid_scores_ = self.rounds_[-1][1]
+        self.best_params_ = scores[0].parameters
+        self.best_score_ = scores[0].mean_validation_score
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y)
+        return self
+
+#######################################################################################################################
+
+    def predict(self, X):
+        """
+        predicts with the best estimator refitted on the whole train set.
+        """
+        return self.best_estimator_.predict(X)
+
+#######################################################################################################################
+
+    def _evaluate(self, candidates, X, y):
+        """
+        cross-validates every candidate on (X, y) and returns a list of (params, fold scores).
+        """
+        folds = list(StratifiedKFold(y, n_folds=self.cv))
+        return Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_and_score)(self.estimator, params, X, y, folds) for params in candidates)
+
+#######################################################################################################################
+
+def _fit_and_score(estimator, params, X, y, folds):
+    """
+    fits and scores the candidate params on every fold and returns (params, fold scores).
+    """
+    cv_scores = []
+    for train, test in folds:
+        model = clone(estimator).set_params(**params)
+        model.fit(X[train], y[train])
+        cv_scores.append(model.score(X[test], y[test]))
+    return params, np.array(cv_scores)
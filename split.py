@@ -0,0 +1,55 @@
+import random
+import numpy as np
+
+
+def random_split(n_images, test_size, random_seed=10):
+    """
+    randomly splits n_images indices into a train and a test set and returns them as index arrays.
+    The test set holds floor(n_images * test_size) indices drawn with random.sample after seeding with
+    random_seed, so it is exactly the test set the original split_train_test used to draw.
+    The train set is every other index in increasing order, found with a boolean mask in O(n).
+    """
+    random.seed(random_seed)
+    k = int(np.floor(n_images * test_size))
+    test = np.array(random.sample(xrange(n_images), k), dtype=np.intp)
+
+    in_test = np.zeros(n_images, dtype=bool)
+    in_test[test] = True
+    train = np.flatnonzero(~in_test)
+
+    return train, test
+
+#######################################################################################################################
+
+def stratified_split(target, test_size, random_seed=10):
+    """
+    splits the indices of target into a train and a test set keeping the proportion of every label:
+    floor(n_label * test_size) images of each label go to the test set.
+    Both index arrays are returned in increasing order.
+    """
+    target = np.asarray(target)
+    rng = np.random.RandomState(random_seed)
+    classes, y = np.unique(target, return_inverse=True)
+    by_class = np.argsort(y, kind='mergesort')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(y))))
+
+    in_test = np.zeros(target.shape[0], dtype=bool)
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        k = int(np.floor((stop - start) * test_size))
+        in_test[rng.choice(by_class[start:stop], k, replace=False)] = True
+
+    return np.flatnonzero(~in_test), np.flatnonzero(in_test)
+
+#######################################################################################################################
+
+def take(dataset, indices):
+    """
+    returns (images, data, target) of the subset of dataset (dictionary with images, data and target)
+    selected by indices. The images are gathered once, in the dtype they are stored in, and data is a
+    flattened view of them, instead of a second copy: the models convert it to float grey levels
+    themselves (see data.GreyLevels). If indices is a slice every array is a view on dataset.
+    On a memory-mapped dataset only the selected images are read from disk.
+    """
+    images = dataset['images'][indices]
+    data = images.reshape((images.shape[0], -1))
+    return images, data, dataset['target'][indices]
@@ -0,0 +1,118 @@
+import os
+import cPickle
+import hashlib
+import numpy as np
+from timeit import default_timer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+
+def _chunks(indices, chunk_size):
+    """
+    returns the indices split in consecutive chunks of chunk_size, each sorted so that reading its
+    rows from a memory map is sequential.
+    """
+    indices = np.sort(indices)
+    return [indices[start:start + chunk_size] for start in range(0, indices.shape[0], chunk_size)]
+
+#######################################################################################################################
+
+def _save_checkpoint(checkpoint, state):
+    """
+    pickles state to checkpoint, through a temporary file so that an interrupted write leaves the previous one.
+    """
+    temporary = checkpoint + '.tmp'
+    with open(temporary, 'wb') as fout:
+        cPickle.dump(state, fout, -1)
+    os.rename(temporary, checkpoint)
+
+#######################################################################################################################
+
+def _fingerprint(images, indices, hog, clf, chunk_size, classes, n_epochs, random_state):
+    """
+    returns the sha1 of what a training depends on: the shape and type of images (not their content,
+    which would have to be read in full), the training rows, the HOG and classifier parameters,
+    chunk_size, the classes, n_epochs and random_state. A checkpoint is only resumed by a training
+    with the same fingerprint.
+    """
+    digest = hashlib.sha1(np.ascontiguousarray(np.sort(indices), dtype=np.int64))
+    digest.update(repr((
+                       images.shape,
+                       images.dtype.str,
+                       sorted(hog.get_params().items()),
+                       type(clf).__name__,
+                       sorted(clf.get_params().items()),
+                       chunk_size,
+                       list(classes),
+                       n_epochs,
+                       random_state,
+                       )))
+    return digest.hexdigest()
+
+#######################################################################################################################
+
+def train_streaming(images, target, hog, indices=None, n_epochs=5, chunk_size=10000, checkpoint=None, clf=None,
+                    random_state=0, verbose=False):
+    """
+    trains a linear classifier on the HOG features of images (n_images x M x N, typically memory-mapped
+    by dataset.load_dataset) without ever holding more than chunk_size images and their features in memory.
+    Every epoch reads the rows at indices (all of them if None) chunk by chunk, in a random order of the
+    chunks and of the images inside each chunk, transforms them with hog (e.g. a HOGFeatures) and
+    passes them to clf.partial_fit. clf is any classifier with partial_fit, by default a linear SVM
+    trained by stochastic gradient descent (SGDClassifier with hinge loss).
+    If checkpoint is given the classifier is pickled there after every epoch, with a fingerprint of
+    the training (see _fingerprint). A training started again with the same checkpoint resumes after
+    the last completed epoch if it has the same fingerprint and epochs are left, and starts from
+    scratch (overwriting the checkpoint) otherwise.
+    Returns the Pipeline(hog + clf), which predicts (and gives decision_function scores) like the
+    Pipeline(hog + LinearSVC) models, so UserData can use it.
+    """
+    if indices is None:
+        indices = np.arange(images.shape[0])
+    if clf is None:
+        clf = SGDClassifier(loss='hinge', alpha=1e-4, random_state=random_state)
+    classes = np.unique(np.asarray(target)[indices])
+    rng = np.random.RandomState(random_state)
+    fingerprint = _fingerprint(images, indices, hog, clf, chunk_size, classes, n_epochs, random_state)
+    first_epoch = 0
+
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with open(checkpoint, 'rb') as fin:
+            state = cPickle.load(fin)
+        if state.get('fingerprint') == fingerprint and state['epoch'] < n_epochs:
+            first_epoch, clf = state['epoch'], state['clf']
+            rng.set_state(state['random_state'])
+            if verbose:
+                print 'Resuming from {} after epoch {}'.format(checkpoint, first_epoch)
+        elif verbose:
+            print 'Ignoring {}: not an unfinished checkpoint of this training'.format(checkpoint)
+
+    chunks = _chunks(indices, chunk_size)
+    for epoch in range(first_epoch, n_epochs):
+        start = default_timer()
+        for chunk in [chunks[i] for i in rng.permutation(len(chunks))]:
+            order = rng.permutation(chunk.shape[0])
+            X = np.asarray(images[chunk])
+            features = hog.transform(X.reshape((X.shape[0], -1)))
+            clf.partial_fit(features[order], np.asarray(target[chunk])[order], classes=classes)
+        if checkpoint is not None:
+            _save_checkpoint(checkpoint, {'epoch': epoch + 1, 'clf': clf, 'random_state': rng.get_state(),
+                                          'fingerprint': fingerprint})
+        if verbose:
+            print 'Epoch {}: {} images in {:.2f} seconds'.format(epoch + 1, indices.shape[0], default_timer() - start)
+
+    return Pipeline([('hog', hog), ('clf', clf)])
+
+#######################################################################################################################
+
+def score_streaming(model, images, target, indices=None, chunk_size=10000):
+    """
+    returns the accuracy of model on the images at indices (all of them if None), predicted chunk_size at a time.
+    """
+    if indices is None:
+        indices = np.arange(images.shape[0])
+    correct = 0
+    for chunk in _chunks(indices, chunk_size):
+        X = np.asarray(images[chunk])
+        correct += np.sum(model.predict(X.reshape((X.shape[0], -1))) == np.asarray(target[chunk]))
+    return float(correct) / indices.shape[0]
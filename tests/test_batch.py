@@ -0,0 +1,17 @@
+import argparse
+import pytest
+
+from batch import run_batch, workers_count
+
+
+@pytest.mark.parametrize('value', ['0', '-2'])
+def test_workers_must_be_positive_or_minus_one(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        workers_count(value)
+    with pytest.raises(ValueError):
+        run_batch(['*.png'], 'text.pickle', 'char.pickle', workers=int(value))
+
+
+def test_minus_one_worker_is_one_per_cpu():
+    assert workers_count('-1') == -1
+    assert workers_count('4') == 4
@@ -0,0 +1,23 @@
+import json
+
+from benchmark import compare_runs
+
+MACHINE = {'platform': 'Linux', 'processor': 'x86_64', 'python': '2.7.18', 'numpy': '1.16.6', 'sklearn': '0.19.2'}
+
+
+def write_run(tmpdir, name, seconds):
+    filename = str(tmpdir.join(name))
+    results = dict((benchmark, {'seconds': value, 'items': 100, 'items_per_second': 100 / value, 'repeat': 3})
+                   for benchmark, value in seconds.items())
+    with open(filename, 'w') as fout:
+        json.dump({'machine': MACHINE, 'n_images': 100, 'results': results}, fout)
+    return filename
+
+
+def test_only_the_benchmarks_slower_than_the_tolerance_are_regressions(tmpdir):
+    old = write_run(tmpdir, 'old.json', {'hog_transform': 1.0, 'inference': 2.0, 'ocr_load': 1.0, 'grid_search': 5.0})
+    new = write_run(tmpdir, 'new.json', {'hog_transform': 1.05, 'inference': 2.5, 'ocr_load': 0.5, 'split_train_test': 1.0})
+
+    assert compare_runs(old, new) == [('inference', 2.0, 2.5, 1.25)]
+    assert compare_runs(old, new, tolerance=0.30) == []
+    assert [name for name, _, _, _ in compare_runs(old, new, tolerance=0.01)] == ['hog_transform', 'inference']
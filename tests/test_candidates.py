@@ -0,0 +1,36 @@
+import os
+import numpy as np
+import pytest
+from skimage.transform import resize
+
+from benchmark import CHAR_MODEL, TEXT_MODEL, synthetic_components_image
+from userimageski import UserData
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('n_components', [1, 7, 100])
+def test_every_component_is_a_candidate_cropped_with_its_margin(n_components):
+    image = synthetic_components_image(n_components)
+    candidates = UserData(image, verbose=False).get_text_candidates()
+
+    rows, cols = np.divmod(np.arange(n_components), int(np.ceil(np.sqrt(n_components))))
+    expected = np.column_stack((10 + 10 * rows, 10 + 10 * cols, 15 + 10 * rows, 15 + 10 * cols))
+    assert np.array_equal(candidates['coordinates'], expected)
+    assert candidates['fullscale'].shape == (n_components, 20, 20)
+    assert candidates['flattened'].shape == (n_components, 400)
+    for (minr, minc, maxr, maxc), crop in zip(candidates['coordinates'], candidates['fullscale']):
+        assert np.array_equal(crop, resize(image[minr - 3:maxr + 3, minc - 3:maxc + 3], (20, 20)))
+
+
+def test_an_image_without_candidates_gives_empty_results():
+    user = UserData(np.ones((64, 64)), verbose=False)
+    candidates = user.get_text_candidates()
+    assert candidates['fullscale'].shape == (0, 20, 20)
+    assert candidates['flattened'].shape == (0, 400)
+    assert candidates['coordinates'].shape == (0, 4)
+
+    assert user.select_text_among_candidates(os.path.join(FOLDER, TEXT_MODEL))['coordinates'].shape == (0, 4)
+    which_text = user.classify_text(os.path.join(FOLDER, CHAR_MODEL))
+    assert which_text['predicted_char'].shape == (0,)
+    assert which_text['score'].shape == (0,)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from benchmark import synthetic_glyphs
+from dataset import MergedDataset, load_dataset, quantize, save_dataset
+
+
+@pytest.fixture
+def sources(tmpdir):
+    # a memory-mapped uint8 dataset (like the OCR one) and an in-memory float64 one (like CIFAR)
+    text, text_target = synthetic_glyphs(50, random_state=1)
+    path = save_dataset(str(tmpdir.join('text')), quantize(text, np.uint8), text_target, 'text')
+    other, other_target = synthetic_glyphs(30, random_state=2)
+    return load_dataset(path), {'images': other, 'target': other_target}
+
+
+def concatenated(sources, n_text, order, dtype):
+    text, other = sources
+    images = np.concatenate((quantize(other['images'], dtype), quantize(text['images'][:n_text], dtype)))
+    target = np.concatenate((np.repeat('0', len(other['target'])), np.repeat('1', n_text)))
+    return images[order], target[order]
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32, np.uint8])
+def test_take_gathers_the_rows_of_the_concatenated_sources(sources, dtype):
+    text, other = sources
+    order = np.random.RandomState(0).permutation(70)
+    merged = MergedDataset([(other, None, '0'), (text, 40, '1')], order=order)
+    images, target = concatenated(sources, 40, order, dtype)
+
+    assert len(merged) == 70
+    assert np.array_equal(merged.target, target)
+    indices = np.random.RandomState(1).choice(70, 25)
+    assert np.array_equal(merged.take(indices, dtype=dtype), images[indices])
+    assert np.array_equal(merged.take(slice(10, 30), dtype=dtype), images[10:30])
+
+
+def test_streamed_save_equals_the_concatenated_sources(sources, tmpdir):
+    text, other = sources
+    order = np.random.RandomState(0).permutation(80)
+    merged = MergedDataset([(other, None, '0'), (text, None, '1')], order=order)
+    images, target = concatenated(sources, 50, order, np.uint8)
+
+    saved = load_dataset(merged.save(str(tmpdir.join('merged')), 'text+other', np.uint8, chunk_size=7))
+    assert saved['images'].dtype == np.uint8
+    assert np.array_equal(saved['images'], images)
+    assert np.array_equal(saved['target'], target)
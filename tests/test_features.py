@@ -0,0 +1,50 @@
+import numpy as np
+from sklearn.grid_search import GridSearchCV
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from benchmark import synthetic_glyphs
+from data import HOGFeatures
+from features import FeatureStore, StoredHOGFeatures
+
+PARAM_GRID = {
+             'hog__orientations': [5, 10],
+             'hog__pixels_per_cell': [(5, 5)],
+             'hog__cells_per_block': [(2, 2)],
+             'clf__C': [0.1, 1],
+             }
+
+
+def test_stored_features_are_the_hog_of_the_indexed_rows(tmpdir):
+    images, _ = synthetic_glyphs(50)
+    data = images.reshape((50, -1))
+    store = FeatureStore(str(tmpdir))
+    fingerprint = store.fingerprint(data)
+    store.get(data, 9, (4, 4), (2, 2), (20, 20), fingerprint)
+    store.get(data, 9, (4, 4), (2, 2), (20, 20), fingerprint)
+    assert (store.misses, store.hits) == (1, 1)
+
+    rows = np.array([3, 0, 41, 3])
+    stored = StoredHOGFeatures(store, fingerprint, (20, 20), 9, (4, 4), (2, 2))
+    hog = HOGFeatures((20, 20), 9, (4, 4), (2, 2))
+    assert np.array_equal(stored.transform(rows[:, np.newaxis]), hog.transform(data[rows]))
+
+
+def test_search_on_stored_features_equals_search_on_images(tmpdir):
+    images, target = synthetic_glyphs(120)
+    data = images.reshape((120, -1))
+    store = FeatureStore(str(tmpdir))
+    fingerprint = store.fingerprint(data)
+    for orientations in PARAM_GRID['hog__orientations']:
+        store.get(data, orientations, (5, 5), (2, 2), (20, 20), fingerprint)
+
+    on_images = GridSearchCV(Pipeline([('hog', HOGFeatures((20, 20))), ('clf', LinearSVC())]), PARAM_GRID, cv=3)
+    on_images.fit(data, target)
+    on_store = GridSearchCV(Pipeline([('hog', StoredHOGFeatures(store, fingerprint, (20, 20))), ('clf', LinearSVC())]),
+                            PARAM_GRID, cv=3, n_jobs=2)
+    on_store.fit(np.arange(120)[:, np.newaxis], target)
+
+    assert on_store.best_params_ == on_images.best_params_
+    for stored, computed in zip(on_store.grid_scores_, on_images.grid_scores_):
+        assert stored.parameters == computed.parameters
+        assert np.array_equal(stored.cv_validation_scores, computed.cv_validation_scores)
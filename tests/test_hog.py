@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from skimage.feature import hog
+from hog import batch_hog
+from benchmark import synthetic_glyphs
+
+# (orientations, pixels_per_cell, cells_per_block): the linearsvc-hog grid of OcrData.set_models, the shipped
+# models (2 and 10 orientations, 5x5 cells, 2x2 blocks) and cells not dividing the image
+SETTINGS = [
+           (2, (2, 2), (2, 2)),
+           (10, (5, 5), (2, 2)),
+           (4, (4, 4), (5, 5)),
+           (5, (5, 5), (4, 4)),
+           (9, (3, 3), (3, 3)),
+           (8, (3, 4), (1, 2)),
+           ]
+
+
+@pytest.mark.parametrize('orientations, pixels_per_cell, cells_per_block', SETTINGS)
+@pytest.mark.parametrize('size', [(20, 20), (24, 18)])
+def test_batch_hog_equals_skimage_hog(orientations, pixels_per_cell, cells_per_block, size):
+    """
+    batch_hog returns, value by value, the per-image skimage.feature.hog the pickled models were trained with.
+    """
+    images, _ = synthetic_glyphs(64, size=size)
+    expected = np.array([hog(image, orientations=orientations, pixels_per_cell=pixels_per_cell,
+                             cells_per_block=cells_per_block) for image in images])
+    features = batch_hog(images, orientations, pixels_per_cell, cells_per_block, chunk_size=20)
+    assert features.shape == expected.shape
+    assert np.array_equal(features, expected)
+
+
+def test_batch_hog_converts_stored_images():
+    """
+    float32 and uint8 images (see dataset.storage_dtype) get the hog of their float64 grey levels in [0, 1].
+    """
+    images, _ = synthetic_glyphs(16)
+    quantized = np.rint(images * 255).astype(np.uint8)
+    expected = np.array([hog(image / 255.0, orientations=10, pixels_per_cell=(5, 5), cells_per_block=(2, 2))
+                         for image in quantized])
+    assert np.array_equal(batch_hog(quantized, 10, (5, 5), (2, 2)), expected)
+
+    single = images.astype(np.float32)
+    expected = np.array([hog(image.astype(np.float64), orientations=10, pixels_per_cell=(5, 5), cells_per_block=(2, 2))
+                         for image in single])
+    assert np.array_equal(batch_hog(single, 10, (5, 5), (2, 2)), expected)
+
+
+def test_batch_hog_rejects_blocks_bigger_than_the_image():
+    with pytest.raises(ValueError):
+        batch_hog(np.zeros((2, 20, 20)), 9, (5, 5), (6, 6))
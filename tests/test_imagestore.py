@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pytest
+from skimage.io import imread, imsave
+
+import imagestore
+from benchmark import synthetic_glyphs
+from imagestore import IMAGES_FILE, ImageStore
+
+
+class Reader():
+    """
+    read_images for the store: reads the pngs as they are (already img_size) and records what it decoded.
+    Images smaller than 20 x 20 are dropped, as by OcrData.read_images.
+    """
+    def __init__(self, folder, fail_at=None):
+        self.folder = folder
+        self.fail_at = fail_at
+        self.decoded = []
+
+    def __call__(self, couples):
+        if self.fail_at is not None and len(self.decoded) >= self.fail_at:
+            raise KeyboardInterrupt
+        images = [imread(os.path.join(self.folder, path + '.png')) for path, _ in couples]
+        kept = np.array([image.shape == (20, 20) for image in images])
+        self.decoded.extend(path for path, _ in couples)
+        return np.array([image for image, is_kept in zip(images, kept) if is_kept], dtype=np.uint8).reshape((-1, 20, 20)), kept
+
+
+@pytest.fixture
+def folder(tmpdir):
+    images, _ = synthetic_glyphs(12)
+    for i, image in enumerate(images):
+        imsave(str(tmpdir.join('img{}.png'.format(i))), (image * 255).astype(np.uint8))
+    # too small to be kept
+    imsave(str(tmpdir.join('img12.png')), np.zeros((5, 5), dtype=np.uint8))
+    return str(tmpdir)
+
+
+def expected(folder, complete):
+    images = [imread(os.path.join(folder, path + '.png')) for path, _ in complete]
+    return np.array([image for image in images if image.shape == (20, 20)])
+
+
+def test_update_decodes_only_new_or_changed_files(folder, tmpdir, monkeypatch):
+    complete = [('img{}'.format(i), 'a') for i in range(13)]
+    store_folder = str(tmpdir.join('store'))
+    reader = Reader(folder)
+    images, kept = ImageStore(store_folder, (20, 20), np.uint8).update(folder, complete, reader, batch_size=5)
+    assert len(reader.decoded) == 13
+    assert np.array_equal(images, expected(folder, complete))
+    assert kept.tolist() == [True] * 12 + [False]
+
+    hashed = []
+    sha1 = imagestore._sha1
+    monkeypatch.setattr(imagestore, '_sha1', lambda filename: hashed.append(filename) or sha1(filename))
+
+    # touched: new mtime, same size and content --> hashed, not decoded
+    touched = os.path.join(folder, 'img3.png')
+    os.utime(touched, (os.path.getmtime(touched) + 10,) * 2)
+    # changed: new content --> decoded again
+    imsave(os.path.join(folder, 'img5.png'), np.full((20, 20), 7, dtype=np.uint8))
+    # new file
+    imsave(os.path.join(folder, 'img13.png'), np.full((20, 20), 9, dtype=np.uint8))
+    complete.append(('img13', 'b'))
+
+    reader = Reader(folder)
+    store = ImageStore(store_folder, (20, 20), np.uint8)
+    images, kept = store.update(folder, complete, reader, batch_size=5)
+    assert sorted(reader.decoded) == ['img13', 'img5']
+    assert sorted(os.path.basename(filename) for filename in hashed) == ['img13.png', 'img3.png', 'img5.png']
+    assert (store.decoded, store.reused) == (2, 12)
+    assert np.array_equal(images, expected(folder, complete))
+
+    # nothing changed since: nothing is hashed or decoded
+    hashed[:] = []
+    reader = Reader(folder)
+    images, _ = ImageStore(store_folder, (20, 20), np.uint8).update(folder, complete, reader)
+    assert reader.decoded == [] and hashed == []
+    assert np.array_equal(images, expected(folder, complete))
+
+
+def test_interrupted_update_resumes_from_the_index(folder, tmpdir):
+    complete = [('img{}'.format(i), 'a') for i in range(13)]
+    store_folder = str(tmpdir.join('store'))
+    reader = Reader(folder, fail_at=5)
+    with pytest.raises(KeyboardInterrupt):
+        ImageStore(store_folder, (20, 20), np.uint8).update(folder, complete, reader, batch_size=5)
+    # a batch cut while being written: half a row after the rows of the saved index
+    with open(os.path.join(store_folder, IMAGES_FILE), 'ab') as fout:
+        fout.write('\xff' * 200)
+
+    store = ImageStore(store_folder, (20, 20), np.uint8)
+    assert store.rows == 5
+    assert os.path.getsize(os.path.join(store_folder, IMAGES_FILE)) == 5 * 20 * 20
+
+    reader = Reader(folder)
+    images, kept = store.update(folder, complete, reader, batch_size=5)
+    assert reader.decoded == ['img{}'.format(i) for i in range(5, 13)]
+    assert np.array_equal(images, expected(folder, complete))
+    assert kept.sum() == 12
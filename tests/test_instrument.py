@@ -0,0 +1,22 @@
+import os
+
+from benchmark import CHAR_MODEL, TEXT_MODEL, synthetic_scene
+from instrument import STAGES, Instruments
+from pipeline import stream_text
+from userimageski import UserData
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS = [os.path.join(FOLDER, TEXT_MODEL), os.path.join(FOLDER, CHAR_MODEL)]
+
+
+def test_only_the_stages_of_the_instrumented_images_are_measured():
+    image, _ = synthetic_scene((240, 320))
+    measured, other = Instruments(), Instruments()
+    list(stream_text([image, image], MODELS[0], MODELS[1], instruments=measured))
+    UserData(image, verbose=False).get_text_candidates()
+    UserData(image, verbose=False, instruments=other)
+
+    assert list(measured.stages) == STAGES
+    # hog runs once per model unless the two models share their HOG step
+    assert all(counters['calls'] == 2 for stage, counters in measured.stages.items() if stage != 'hog')
+    assert list(other.stages) == ['load', 'denoise', 'threshold']
@@ -0,0 +1,42 @@
+import os
+import cPickle
+import numpy as np
+import pytest
+
+from benchmark import CHAR_MODEL, TEXT_MODEL
+from linear import LinearHOGModel, check_sample, export_model
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('model_name', [TEXT_MODEL, CHAR_MODEL])
+def test_exported_model_predicts_as_the_pickle(tmpdir, model_name):
+    model_filename = os.path.join(FOLDER, model_name)
+    data = check_sample(model_filename, n_images=500)
+    npz_filename = export_model(model_filename, str(tmpdir.join('model.npz')), check_data=data)
+    with open(model_filename, 'rb') as fin:
+        model = cPickle.load(fin)
+    exported = LinearHOGModel.load(npz_filename)
+
+    assert np.array_equal(exported.predict(data), model.predict(data))
+    assert np.array_equal(exported.decision_function(data), model.decision_function(data))
+
+    # the classifiers alone, on the same HOG features
+    features = model.steps[0][1].transform(data)
+    assert np.array_equal(exported.steps[0][1].transform(data), features)
+    assert np.array_equal(exported.steps[1][1].predict(features), model.steps[-1][1].predict(features))
+    assert np.array_equal(exported.steps[1][1].decision_function(features), model.steps[-1][1].decision_function(features))
+
+
+def test_export_check_fails_on_a_different_model(tmpdir, monkeypatch):
+    model_filename = os.path.join(FOLDER, TEXT_MODEL)
+    load = LinearHOGModel.load
+
+    def load_shifted(filename):
+        exported = load(filename)
+        exported.steps[1][1].intercept_ = exported.steps[1][1].intercept_ + 1.0
+        return exported
+
+    monkeypatch.setattr(LinearHOGModel, 'load', staticmethod(load_shifted))
+    with pytest.raises(ValueError):
+        export_model(model_filename, str(tmpdir.join('model.npz')), check_data=check_sample(model_filename, n_images=100))
@@ -0,0 +1,38 @@
+import os
+import numpy as np
+from skimage.io import imread, imsave
+
+from benchmark import synthetic_chars74k
+from data import OcrData
+
+
+def load(folder, config, n_jobs):
+    config = dict(config, n_jobs=n_jobs, chunk_size=7)
+    config_file = os.path.join(folder, 'ocr-config-{}.py'.format(n_jobs))
+    with open(config_file, 'w') as fout:
+        fout.write(repr(config))
+    return OcrData(config_file)
+
+
+def test_parallel_load_is_identical_to_the_serial_load(tmpdir):
+    folder = str(tmpdir)
+    config = synthetic_chars74k(os.path.join(folder, 'chars74k'), 60)
+    # images smaller than img_size are dropped by both loaders
+    images = os.path.join(folder, 'chars74k', 'Englishimg', 'Img')
+    small = sorted(os.path.join(root, name) for root, _, names in os.walk(images) for name in names)[::13]
+    for filename in small:
+        imsave(filename, imread(filename)[:10, :10])
+
+    serial = load(folder, config, 1)
+    parallel = load(folder, config, 2)
+
+    assert serial.ocr['images'].shape[0] == 60 - len(small)
+    assert serial.ocr['images'].dtype == parallel.ocr['images'].dtype
+    assert np.array_equal(serial.ocr['images'], parallel.ocr['images'])
+    assert np.array_equal(serial.ocr['target'], parallel.ocr['target'])
+
+    complete = zip(serial.getRelativePath(), serial.getLabels())
+    read, kept = serial.read_images(complete)
+    shared, loaded = parallel.load_parallel(complete)
+    assert np.array_equal(kept, loaded)
+    assert np.array_equal(read, shared)
@@ -0,0 +1,36 @@
+import os
+import shutil
+
+from benchmark import legacy_manifests
+from manifest import load_manifests, parse_manifest
+
+IMAGE_TREE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ImageTree')
+
+
+def test_single_pass_parser_equals_the_legacy_parser():
+    expected = legacy_manifests(IMAGE_TREE)
+    assert len(expected[0]) > 0
+    assert load_manifests(IMAGE_TREE) == expected
+
+
+def test_class_tables_are_read_with_the_records():
+    tables = {}
+    records = list(parse_manifest(os.path.join(IMAGE_TREE, 'list_English_Img.m'), tables))
+    assert len(records) > 0
+    assert len(tables['classlabels']) == len(tables['classnames']) > 0
+
+
+def test_cache_is_read_back_until_a_manifest_changes(tmpdir):
+    folder = str(tmpdir.mkdir('ImageTree'))
+    for name in os.listdir(IMAGE_TREE):
+        shutil.copy(os.path.join(IMAGE_TREE, name), folder)
+    cache = str(tmpdir.join('manifest-cache.npz'))
+    expected = load_manifests(folder)
+
+    assert load_manifests(folder, cache) == expected
+    assert os.path.exists(cache)
+    assert load_manifests(folder, cache) == expected
+
+    os.remove(os.path.join(folder, 'list_English_Hnd.m'))
+    assert load_manifests(folder, cache) == load_manifests(folder)
+    assert len(load_manifests(folder, cache)[0]) < len(expected[0])
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+
+from benchmark import synthetic_scene
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# prints the growth of the peak resident memory of a fresh interpreter during the preprocessing and the
+# extraction of the text candidates of the image in path (the imports and a first small image come before)
+MEMORY_SCRIPT = '''
+import resource
+import numpy as np
+from userimageski import UserData
+image = np.load({image!r})
+UserData(np.ones((64, 64)), verbose=False).get_text_candidates()
+start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+user = UserData(image, verbose=False, working_size={working_size!r})
+user.get_text_candidates()
+print (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start) * 1024
+'''
+
+
+def preprocessing_peak(tmpdir, shape, working_size=None):
+    """
+    returns the peak memory of the preprocessing of a synthetic scene of the given shape, in times
+    the size of the (float64) image.
+    """
+    image = str(tmpdir.join('scene.npy'))
+    np.save(image, synthetic_scene(shape, char_size=shape[0] // 20)[0])
+    script = MEMORY_SCRIPT.format(image=image, working_size=working_size)
+    peak = int(subprocess.check_output([sys.executable, '-c', script], cwd=FOLDER))
+    return peak / (8.0 * shape[0] * shape[1])
+
+
+@pytest.mark.parametrize('shape', [(480, 640), (960, 1280)])
+def test_preprocessing_peaks_at_the_total_variation_denoising(tmpdir, shape):
+    # denoise_tv_chambolle works with about 9 times the image, the other stages must not add to it
+    assert preprocessing_peak(tmpdir, shape) <= 10.0
+
+
+def test_working_size_bounds_the_preprocessing_memory(tmpdir):
+    assert preprocessing_peak(tmpdir, (1920, 2560), working_size=1024) <= 2.5
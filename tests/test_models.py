@@ -0,0 +1,51 @@
+import os
+import cPickle
+
+from models import ModelRegistry
+
+
+def save(tmpdir, name, model):
+    filename = str(tmpdir.join(name))
+    with open(filename, 'wb') as fout:
+        cPickle.dump(model, fout, -1)
+    return filename
+
+
+def test_registry_reloads_changed_files_and_evicts_the_least_recently_used(tmpdir):
+    first = save(tmpdir, 'first.pickle', {'name': 'first'})
+    second = save(tmpdir, 'second.pickle', {'name': 'second'})
+    registry = ModelRegistry(max_models=1)
+
+    model = registry.get(first)
+    assert registry.get(first) is model
+    assert (registry.hits, registry.misses) == (1, 1)
+
+    # a new modification time makes the registry unpickle the file again
+    save(tmpdir, 'first.pickle', {'name': 'changed'})
+    mtime = os.path.getmtime(first)
+    os.utime(first, (mtime + 10, mtime + 10))
+    changed = registry.get(first)
+    assert changed is not model and changed == {'name': 'changed'}
+    assert (registry.hits, registry.misses) == (1, 2)
+
+    # with a single slot, loading second evicts first
+    assert registry.get(second) == {'name': 'second'}
+    assert list(registry.models) == [os.path.abspath(second)]
+    assert registry.get(first) is not changed
+    assert (registry.hits, registry.misses) == (1, 4)
+
+    registry.clear()
+    assert (len(registry.models), registry.hits, registry.misses) == (0, 0, 0)
+
+
+def test_registry_keeps_the_most_recently_used_models(tmpdir):
+    names = ['a', 'b', 'c']
+    filenames = dict((name, save(tmpdir, name + '.pickle', name)) for name in names)
+    registry = ModelRegistry(max_models=2)
+
+    registry.warm_up([filenames['a'], filenames['b']])
+    registry.get(filenames['a'])
+    registry.get(filenames['c'])
+
+    assert list(registry.models) == [os.path.abspath(filenames[name]) for name in ('a', 'c')]
+    assert (registry.hits, registry.misses) == (1, 3)
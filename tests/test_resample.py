@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from skimage.transform import resize
+
+from dataset import quantize
+from resample import resize_batch
+
+
+def random_crops(n_images=500, random_state=0):
+    """
+    returns n_images random crops of 5 to 80 pixels a side, float64 and uint8 in turn.
+    """
+    rng = np.random.RandomState(random_state)
+    images = []
+    for i in range(n_images):
+        image = rng.rand(*rng.randint(5, 81, size=2))
+        images.append((image * 255).astype(np.uint8) if i % 2 else image)
+    return images
+
+
+@pytest.mark.parametrize('output_shape', [(20, 20), (16, 24)])
+def test_resize_batch_equals_skimage_resize(output_shape):
+    images = random_crops()
+    expected = np.array([resize(image, output_shape) for image in images])
+
+    assert np.array_equal(resize_batch(images, output_shape, dtype=np.float64), expected)
+    assert np.array_equal(resize_batch(images, output_shape), expected.astype(np.float32))
+    assert np.array_equal(resize_batch(images, output_shape, dtype=np.uint8), quantize(expected, np.uint8))
+
+
+def test_resize_batch_fills_out():
+    images = random_crops(20)
+    out = np.empty((20, 20, 20), dtype=np.float32)
+    assert resize_batch(images, out=out) is out
+    assert np.array_equal(out, resize_batch(images))
@@ -0,0 +1,29 @@
+from sklearn.grid_search import ParameterGrid
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from benchmark import synthetic_glyphs
+from data import HOGFeatures
+from search import SuccessiveHalvingSearch
+
+PARAM_GRID = {
+             'hog__orientations': [2, 5, 10],
+             'hog__pixels_per_cell': [(5, 5)],
+             'hog__cells_per_block': [(2, 2)],
+             'clf__C': [0.1, 1],
+             }
+
+
+def test_grid_scores_are_the_last_round_on_the_whole_train_set():
+    images, target = synthetic_glyphs(400)
+    model = Pipeline([('hog', HOGFeatures((20, 20))), ('clf', LinearSVC())])
+    search = SuccessiveHalvingSearch(model, PARAM_GRID, min_samples=100).fit(images.reshape((400, -1)), target)
+
+    assert [size for size, _ in search.rounds_] == [100, 200, 400]
+    assert len(search.rounds_[0][1]) == len(ParameterGrid(PARAM_GRID))
+    assert search.grid_scores_ == search.rounds_[-1][1]
+    assert set(score.n_samples for score in search.grid_scores_) == set([400])
+
+    best = max(search.grid_scores_, key=lambda score: score.mean_validation_score)
+    assert search.best_params_ == best.parameters
+    assert search.best_score_ == best.mean_validation_score
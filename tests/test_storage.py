@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from benchmark import synthetic_glyphs, synthetic_scene
+from data import GreyLevels, HOGFeatures
+from dataset import quantize, storage_dtype
+from split import take
+from userimageski import UserData
+
+DTYPES = ['float64', 'float32', 'uint8']
+
+
+@pytest.mark.parametrize('name', DTYPES)
+def test_take_keeps_the_storage_dtype_and_grey_levels_converts_it(name):
+    images, target = synthetic_glyphs(100)
+    dataset = {'images': quantize(images, storage_dtype(name)), 'target': target}
+    stored, data, labels = take(dataset, np.arange(0, 100, 3))
+
+    assert stored.dtype == data.dtype == storage_dtype(name)
+    assert np.may_share_memory(stored, data)
+    grey = GreyLevels().transform(data)
+    assert grey.dtype == np.float64
+    # uint8 grey levels are rounded to the nearest 1/255
+    assert np.abs(grey - images[::3].reshape((34, -1))).max() <= 0.5 / 255 + 1e-12
+    assert np.array_equal(labels, target[::3])
+
+
+def test_storage_dtypes_keep_the_accuracy(n_images=4000, tolerance=0.01, test_size=0.25):
+    images, target = synthetic_glyphs(n_images)
+    n_train = int(n_images * (1 - test_size))
+    accuracy = {}
+    for name in DTYPES:
+        dataset = {'images': quantize(images, storage_dtype(name)), 'target': target}
+        _, data_train, labels_train = take(dataset, slice(0, n_train))
+        _, data_test, labels_test = take(dataset, slice(n_train, None))
+        for model_name, model in (('linearsvc', Pipeline([('grey', GreyLevels()), ('clf', LinearSVC(C=0.5))])),
+                                  ('linearsvc-hog', Pipeline([('hog', HOGFeatures(orientations=10, pixels_per_cell=(5, 5),
+                                                                                  cells_per_block=(2, 2), size=images.shape[1:])),
+                                                              ('clf', LinearSVC(C=2.0))]))):
+            model.fit(data_train, labels_train)
+            accuracy[model_name, name] = np.mean(model.predict(data_test) == labels_test)
+
+    for (model_name, name), value in accuracy.items():
+        assert abs(value - accuracy[model_name, 'float64']) <= tolerance, (model_name, name, value)
+
+
+def test_user_data_storage_dtype_is_per_instance():
+    image, _ = synthetic_scene((240, 320))
+    compact = UserData(image, verbose=False, storage_dtype='float32').get_text_candidates()
+    default = UserData(image, verbose=False).get_text_candidates()
+
+    assert compact['fullscale'].dtype == np.float32
+    assert default['fullscale'].dtype == np.float64
+    assert np.array_equal(compact['fullscale'], default['fullscale'].astype(np.float32))
+    with pytest.raises(ValueError):
+        UserData(image, verbose=False, storage_dtype='int16')
@@ -0,0 +1,85 @@
+import os
+import cPickle
+import numpy as np
+import pytest
+
+from benchmark import synthetic_glyphs
+from data import HOGFeatures
+from streaming import train_streaming
+
+N_EPOCHS = 3
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptedHOG(HOGFeatures):
+    """
+    HOGFeatures counting the calls of transform and raising Interrupted at call interrupt_at, as a
+    training killed in the middle. Neither is a parameter, so the training fingerprint is the one of HOGFeatures.
+    """
+    interrupt_at = None
+    calls = 0
+
+    def transform(self, X):
+        self.calls += 1
+        if self.calls == self.interrupt_at:
+            raise Interrupted()
+        return super(InterruptedHOG, self).transform(X)
+
+
+@pytest.fixture(scope='module')
+def glyphs():
+    images, target = synthetic_glyphs(600)
+    return images, target, np.arange(500)
+
+
+def train(glyphs, checkpoint=None, indices=None, interrupt_at=None):
+    """
+    returns (model, number of HOG transforms) of a streaming training on glyphs, 5 chunks per epoch.
+    """
+    images, target, train_indices = glyphs
+    hog = InterruptedHOG((20, 20), 10, (5, 5), (2, 2))
+    hog.interrupt_at = interrupt_at
+    indices = train_indices if indices is None else indices
+    model = train_streaming(images, target, hog, indices, N_EPOCHS, chunk_size=100, checkpoint=checkpoint)
+    return model, hog.calls
+
+
+def coefficients(model):
+    return model.named_steps['clf'].coef_
+
+
+def test_an_interrupted_training_resumes_where_it_stopped(glyphs, tmpdir):
+    checkpoint = str(tmpdir.join('checkpoint.pickle'))
+    with pytest.raises(Interrupted):
+        # stops in the middle of the third epoch
+        train(glyphs, checkpoint, interrupt_at=13)
+    with open(checkpoint, 'rb') as fin:
+        assert cPickle.load(fin)['epoch'] == 2
+
+    resumed, calls = train(glyphs, checkpoint)
+    assert calls == 5
+    assert np.array_equal(coefficients(resumed), coefficients(train(glyphs)[0]))
+
+
+def test_a_checkpoint_of_another_training_is_not_resumed(glyphs, tmpdir):
+    checkpoint = str(tmpdir.join('checkpoint.pickle'))
+    with pytest.raises(Interrupted):
+        train(glyphs, checkpoint, indices=np.arange(100, 600), interrupt_at=13)
+
+    model, calls = train(glyphs, checkpoint)
+    assert calls == N_EPOCHS * 5
+    assert np.array_equal(coefficients(model), coefficients(train(glyphs)[0]))
+    with open(checkpoint, 'rb') as fin:
+        assert cPickle.load(fin)['epoch'] == N_EPOCHS
+
+
+def test_a_finished_checkpoint_is_trained_again(glyphs, tmpdir):
+    checkpoint = str(tmpdir.join('checkpoint.pickle'))
+    expected = coefficients(train(glyphs, checkpoint)[0])
+
+    model, calls = train(glyphs, checkpoint)
+    assert calls == N_EPOCHS * 5
+    assert np.array_equal(coefficients(model), expected)
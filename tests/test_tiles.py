@@ -0,0 +1,76 @@
+import os
+import numpy as np
+import pytest
+
+from benchmark import CHAR_MODEL, TEXT_MODEL, synthetic_scene
+from tiles import _merge_boxes, tile_windows, tiled_text
+from userimageski import UserData
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def scene():
+    image, _ = synthetic_scene((480, 640), char_size=24)
+    user = UserData(image, verbose=False)
+    user.get_text_candidates()
+    user.select_text_among_candidates(os.path.join(FOLDER, TEXT_MODEL))
+    which_text = user.classify_text(os.path.join(FOLDER, CHAR_MODEL))
+    # tiled_text sorts its results by row and column
+    order = np.lexsort(which_text['coordinates'].T[::-1])
+    return image, which_text['coordinates'][order], which_text['predicted_char'][order]
+
+
+def tiled(image, tile_size, overlap):
+    return tiled_text(image, os.path.join(FOLDER, TEXT_MODEL), os.path.join(FOLDER, CHAR_MODEL),
+                      tile_size=tile_size, overlap=overlap)
+
+
+def seen_whole(box, shape, tile_size, overlap):
+    return sum(minr <= box[0] and box[2] <= maxr and minc <= box[1] and box[3] <= maxc
+               for (minr, minc, maxr, maxc), _ in tile_windows(shape, tile_size, overlap))
+
+
+def test_tiles_are_whole_and_their_cores_cover_the_image_once():
+    shape = (300, 500)
+    covered = np.zeros(shape, dtype=int)
+    for (minr, minc, maxr, maxc), core in tile_windows(shape, 128, 16):
+        assert (maxr - minr, maxc - minc) == (128, 128)
+        assert minr <= core[0] <= core[2] <= maxr and minc <= core[1] <= core[3] <= maxc
+        covered[core[0]:core[2], core[1]:core[3]] += 1
+    assert np.all(covered == 1)
+
+
+def test_merge_boxes_merges_chains_of_overlapping_boxes():
+    # [10, 5, 12, 25] grows [0, 20, 20, 30] into [0, 0, 5, 10], which was passed by the first sweep
+    boxes = [[0, 0, 5, 10], [0, 20, 20, 30], [10, 5, 12, 25], [40, 40, 50, 50]]
+    assert sorted(_merge_boxes(boxes)) == [[0, 0, 20, 30], [40, 40, 50, 50]]
+
+
+def test_objects_seen_by_two_tiles_are_recognized_once(scene):
+    image, coordinates, _ = scene
+    result = tiled(image, 160, 48)
+
+    twice = [box for box in coordinates if seen_whole(box, image.shape, 160, 48) >= 2]
+    assert len(twice) > 0
+    for box in twice:
+        assert np.sum(np.all(result['coordinates'] == box, axis=1)) == 1
+    assert result['coordinates'].shape == coordinates.shape
+
+
+def test_characters_cut_by_a_seam_are_merged_into_their_whole_box(scene):
+    image, coordinates, _ = scene
+    result = tiled(image, 128, 4)
+
+    cut = [box for box in coordinates if seen_whole(box, image.shape, 128, 4) == 0]
+    assert len(cut) > 0
+    for box in cut:
+        assert np.sum(np.all(result['coordinates'] == box, axis=1)) == 1
+
+
+def test_tiled_text_equals_the_whole_image_pipeline(scene):
+    image, coordinates, predicted_char = scene
+    result = tiled(image, 200, 40)
+
+    assert np.array_equal(result['coordinates'], coordinates)
+    assert np.array_equal(result['predicted_char'], predicted_char)
@@ -0,0 +1,38 @@
+import os
+import numpy as np
+
+from benchmark import CHAR_MODEL, synthetic_scene, train_text_model
+from userimageski import UserData
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHAR_MODEL = os.path.join(FOLDER, CHAR_MODEL)
+
+
+def recognize(image, text_model, **options):
+    user = UserData(image, verbose=False, **options)
+    user.get_text_candidates()
+    user.select_text_among_candidates(text_model)
+    return user.classify_text(CHAR_MODEL)
+
+
+def test_sharing_the_hog_features_does_not_change_the_predictions(tmpdir):
+    image, _ = synthetic_scene((240, 320))
+    text_model = train_text_model(CHAR_MODEL, str(tmpdir.join('text-shared-hog.pickle')), n_images=400)
+
+    shared = recognize(image, text_model)
+    computed = recognize(image, text_model, share_hog=False)
+    assert shared['predicted_char'].shape[0] > 0
+    assert np.array_equal(shared['predicted_char'], computed['predicted_char'])
+    assert np.array_equal(shared['coordinates'], computed['coordinates'])
+    assert np.array_equal(shared['score'], computed['score'])
+
+
+def test_clear_border_drops_the_objects_touching_the_sides():
+    image, _ = synthetic_scene((240, 320))
+    image[100:140, :6] = 0.
+
+    kept = UserData(image, verbose=False).get_text_candidates()['coordinates']
+    cleared = UserData(image, verbose=False, clear_border=True).get_text_candidates()['coordinates']
+    touching = (kept[:, 0] == 0) | (kept[:, 1] == 0) | (kept[:, 2] == 240) | (kept[:, 3] == 320)
+    assert np.any(touching)
+    assert np.array_equal(cleared, kept[~touching])
@@ -0,0 +1,41 @@
+import os
+import numpy as np
+from skimage.transform import resize
+
+from benchmark import CHAR_MODEL, TEXT_MODEL, matching_boxes, synthetic_scene
+from userimageski import UserData
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def recognize(image, working_size=None):
+    user = UserData(image, verbose=False, working_size=working_size)
+    candidates = user.get_text_candidates()
+    user.select_text_among_candidates(os.path.join(FOLDER, TEXT_MODEL))
+    return user, candidates, user.classify_text(os.path.join(FOLDER, CHAR_MODEL))
+
+
+def test_a_working_size_bigger_than_the_image_changes_nothing():
+    image, _ = synthetic_scene((240, 320))
+    _, full, _ = recognize(image)
+    user, same, _ = recognize(image, working_size=320)
+
+    assert user.scale == (1.0, 1.0)
+    for key in ('coordinates', 'fullscale'):
+        assert np.array_equal(same[key], full[key])
+
+
+def test_downscaled_boxes_are_cropped_from_the_full_resolution_image():
+    shape = (960, 1280)
+    image, _ = synthetic_scene(shape, char_size=shape[0] // 20)
+    _, _, reference = recognize(image)
+    user, candidates, which_text = recognize(image, working_size=960)
+
+    assert user.bw.shape == (720, 960)
+    coordinates = candidates['coordinates']
+    assert np.all(coordinates[:, :2] >= 0) and np.all(coordinates[:, 2] <= shape[0]) and np.all(coordinates[:, 3] <= shape[1])
+    for (minr, minc, maxr, maxc), crop in zip(coordinates[:20], candidates['fullscale']):
+        roi = image[max(minr - 3, 0):maxr + 3, max(minc - 3, 0):maxc + 3]
+        assert np.array_equal(crop, resize(roi, (20, 20)))
+    # measured 0.655 of the full resolution boxes found again: a floor against regressions
+    assert matching_boxes(reference, which_text) >= 0.6
@@ -8,5 +8,7 @@
      'limit': 0,
      'automatic_split': False,
      'plot_evaluation': False,
+     'n_jobs': -1,
+     'chunk_size': 1000,
     
 }
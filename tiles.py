@@ -0,0 +1,239 @@
+import numpy as np
+from skimage import restoration
+from skimage.color import rgb2gray
+from skimage.util import img_as_float
+from userimageski import UserData
+
+# objects closer than this to a seam are cropped (get_text_candidates adds a 3 pixels margin) and
+# possibly segmented differently by the two tiles, so they are treated as cut by the seam
+SEAM = 3
+# pixels of context denoised around the cores of the tiles by image_threshold and, at least, around the merged
+# pieces of a cut object, so that it does not touch a seam of the window processed again
+CONTEXT = 16
+
+def open_image(source):
+    """
+    returns the image in source without loading it in memory whenever the format allows it:
+    numpy arrays (including memory maps) are used as they are, .npy files are memory-mapped,
+    any other image file is read (as grey scale) once.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if source.endswith('.npy'):
+        return np.load(source, mmap_mode='r')
+    from skimage.io import imread
+    return imread(source, as_grey=True)
+
+#######################################################################################################################
+
+def _tile_spans(length, tile_size, overlap):
+    """
+    returns the (start, stop, core_start, core_stop) spans of the tiles covering length pixels.
+    Consecutive tiles overlap by overlap pixels, except the last one, which is anchored at the end
+    (so that it is a whole tile and not a thin strip) and overlaps the previous one by more.
+    The cores split every overlap half and half: each pixel is in the core of exactly one tile.
+    """
+    starts = range(0, max(length - tile_size, 0), tile_size - overlap) + [max(length - tile_size, 0)]
+    stops = [min(start + tile_size, length) for start in starts]
+    bounds = [0] + [(start + stop) // 2 for start, stop in zip(starts[1:], stops[:-1])] + [length]
+    return zip(starts, stops, bounds[:-1], bounds[1:])
+
+#######################################################################################################################
+
+def tile_windows(shape, tile_size, overlap):
+    """
+    returns the (window, core) of the tiles covering an image of the given shape, both as
+    (minr, minc, maxr, maxc): the window is the tile, the core the part of it the tile owns
+    (see _tile_spans). Consecutive tiles overlap by at least overlap pixels.
+    """
+    rows = _tile_spans(shape[0], tile_size, overlap)
+    cols = _tile_spans(shape[1], tile_size, overlap)
+    return [((r0, c0, r1, c1), (rc0, cc0, rc1, cc1)) for r0, r1, rc0, rc1 in rows for c0, c1, cc0, cc1 in cols]
+
+#######################################################################################################################
+
+def _otsu(hist, bin_centers):
+    """
+    returns the Otsu threshold of the histogram hist of bins centered on bin_centers, as
+    skimage.filter.threshold_otsu computes it on the histogram of an image.
+    """
+    nonzero = np.nonzero(hist)[0]
+    hist = hist[nonzero[0]:nonzero[-1] + 1].astype(float)
+    bin_centers = bin_centers[nonzero[0]:nonzero[-1] + 1]
+    weight1 = np.cumsum(hist)
+    weight2 = np.cumsum(hist[::-1])[::-1]
+    mean1 = np.cumsum(hist * bin_centers) / weight1
+    mean2 = (np.cumsum((hist * bin_centers)[::-1]) / weight2[::-1])[::-1]
+    variance12 = weight1[:-1] * weight2[1:] * (mean1[:-1] - mean2[1:]) ** 2
+    return bin_centers[:-1][np.argmax(variance12)]
+
+#######################################################################################################################
+
+def image_threshold(image, tiles, nbins=256):
+    """
+    returns the Otsu threshold of the denoised image, computed on the histogram of the cores of tiles
+    (the (window, core) of tile_windows) accumulated core by core, so that the image is never denoised
+    whole. Every core is denoised with CONTEXT pixels around it, as in the whole image, which costs
+    an extra denoising of every tile.
+    Every tile is binarized with it, as UserData binarizes a whole image with a single threshold:
+    the Otsu threshold of a tile showing mostly background would split its noise into objects.
+    """
+    # denoising (as img_as_float) maps integer images to [0, 1] and does not widen the range of the values
+    low, high = img_as_float(np.array([np.min(image), np.max(image)], dtype=image.dtype))
+    fine = np.zeros(nbins * 256, dtype=int)
+    lowest, highest = high, low
+    for _, core in tiles:
+        minr, minc = max(core[0] - CONTEXT, 0), max(core[1] - CONTEXT, 0)
+        tile = np.asarray(image[minr:core[2] + CONTEXT, minc:core[3] + CONTEXT])
+        denoised = restoration.denoise_tv_chambolle(rgb2gray(tile) if tile.ndim == 3 else tile, weight=0.1)
+        denoised = np.clip(denoised[core[0] - minr:core[2] - minr, core[1] - minc:core[3] - minc], low, high)
+        lowest, highest = min(lowest, denoised.min()), max(highest, denoised.max())
+        fine += np.histogram(denoised, fine.shape[0], (low, high))[0]
+    # threshold_otsu bins the values between the lowest and the highest one in nbins bins
+    edges = np.linspace(low, high, fine.shape[0] + 1)
+    bins = np.clip(((edges[:-1] + edges[1:]) / 2 - lowest) / (highest - lowest) * nbins, 0, nbins - 1).astype(int)
+    edges = np.linspace(lowest, highest, nbins + 1)
+    return _otsu(np.bincount(bins, weights=fine, minlength=nbins), (edges[:-1] + edges[1:]) / 2)
+
+#######################################################################################################################
+
+def _seam_sides(boxes, window, shape):
+    """
+    returns, for each of boxes (minr, minc, maxr, maxc), which sides of window it touches (as a
+    boolean array of the same shape) and, for each of them, whether one of those sides is a seam
+    (a side of the window which is not a side of the image): the object may then be cut.
+    """
+    minr, minc, maxr, maxc = window
+    inner = np.array([minr > 0, minc > 0, maxr < shape[0], maxc < shape[1]])
+    touches = np.abs(np.asarray(boxes).reshape((-1, 4)) - window) <= SEAM
+    return touches, np.any(touches & inner, axis=1)
+
+#######################################################################################################################
+
+def _recognize_window(image, window, model_filename2, model_filename36, working_size, instruments, threshold):
+    """
+    runs the UserData stages (binarizing with threshold) on a window of image and returns the coordinates
+    (in the whole image), predicted characters and scores of the recognized objects not touching a seam
+    (see _seam_sides), plus the coordinates of the candidates touching one, text or not (a piece of a
+    character is seldom taken for text), but for those spanning the window (the background, frames).
+    """
+    minr, minc, maxr, maxc = window
+    # the sides of a tile are seams, not sides of the image: tiled_text clears the border itself
+    user = UserData(np.asarray(image[minr:maxr, minc:maxc]), verbose=False, working_size=working_size,
+                    instruments=instruments, threshold=threshold)
+    candidates = user.get_text_candidates()['coordinates'] + [minr, minc, minr, minc]
+    del user.bw
+    touches, cut = _seam_sides(candidates, window, image.shape)
+    spanning = (touches[:, 0] & touches[:, 2]) | (touches[:, 1] & touches[:, 3])
+    user.select_text_among_candidates(model_filename2)
+    del user.image, user.candidates
+    which_text = user.classify_text(model_filename36)
+
+    coordinates = which_text['coordinates'] + [minr, minc, minr, minc]
+    whole = ~_seam_sides(coordinates, window, image.shape)[1]
+    return coordinates[whole], which_text['predicted_char'][whole], which_text['score'][whole], candidates[cut & ~spanning]
+
+#######################################################################################################################
+
+def _merge_boxes(boxes):
+    """
+    merges the overlapping (or touching) boxes into their bounding box, until no two boxes overlap.
+    Every pass sweeps the boxes sorted by their first row, so that a box is only compared with the
+    merged boxes whose rows reach it. A merged box may grow into a box it was not compared with,
+    the passes are repeated until one merges nothing (usually the second).
+    """
+    boxes = [list(box) for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        done = []
+        active = []
+        for box in sorted(boxes):
+            done.extend(other for other in active if other[2] < box[0])
+            active = [other for other in active if other[2] >= box[0]]
+            for other in active:
+                # sorted by first row, the rows of other and box overlap
+                if other[1] <= box[3] and box[1] <= other[3]:
+                    other[:] = [other[0], min(other[1], box[1]), max(other[2], box[2]), max(other[3], box[3])]
+                    merged = True
+                    break
+            else:
+                active.append(box)
+        boxes = done + active
+    return boxes
+
+#######################################################################################################################
+
+def _overlaps(box, boxes, min_overlap=0.5):
+    """
+    returns whether box overlaps any of boxes by at least min_overlap (intersection over union).
+    """
+    if len(boxes) == 0:
+        return False
+    boxes = np.array(boxes)
+    top_left = np.maximum(box[:2], boxes[:, :2])
+    bottom_right = np.minimum(box[2:], boxes[:, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+    union = np.prod(box[2:] - box[:2]) + np.prod(boxes[:, 2:] - boxes[:, :2], axis=1) - intersection
+    return bool(np.any(intersection >= min_overlap * union))
+
+#######################################################################################################################
+
+def tiled_text(source, model_filename2, model_filename36, tile_size=1024, overlap=128, working_size=None,
+               clear_border=False, instruments=None):
+    """
+    recognizes the text of a very large image (scanned posters, documents) tile by tile, so that the
+    arrays of the UserData stages (grey scale, denoised and binary images, labels) have the size of
+    a tile and not of the image. source is an image file or array, see open_image.
+    The image is cut in tile_size x tile_size tiles overlapping by overlap pixels (see tile_windows),
+    all binarized with the same threshold (see image_threshold). Every object is kept by the tile
+    owning its center (each overlap is split half and half), so that objects seen by two tiles are
+    reported once. Objects cut by a seam are merged across tiles: the boxes of their pieces (the
+    candidates touching the seam, text or not) are merged and the UserData stages run again on a
+    window around the merged box. Objects bigger than overlap are handled the same way, their window
+    is the only array which grows with them; objects smaller than overlap are always seen whole by
+    the tile owning them (with no overlap, an object whose pieces are all below the area filter of
+    get_text_candidates is lost). With clear_border, objects touching the sides of the image are dropped.
+    instruments (an instrument.Instruments) measure the stages of every tile.
+    Returns a dictionary with the coordinates (minr, minc, maxr, maxc), predicted_char and score
+    of the recognized characters, sorted by row and column.
+    """
+    if not 0 <= overlap < tile_size:
+        raise ValueError('overlap must be between 0 and tile_size - 1, got {}.'.format(overlap))
+    image = open_image(source)
+    shape = image.shape[:2]
+    tiles = tile_windows(shape, tile_size, overlap)
+    threshold = image_threshold(image, tiles)
+
+    kept = []
+    cut = []
+    for window, core in tiles:
+        coordinates, chars, scores, pieces = _recognize_window(image, window, model_filename2, model_filename36, working_size,
+                                                               instruments, threshold)
+        cut.extend(pieces)
+        for box, char, score in zip(coordinates, chars, scores):
+            centre = ((box[0] + box[2]) // 2, (box[1] + box[3]) // 2)
+            if core[0] <= centre[0] < core[2] and core[1] <= centre[1] < core[3]:
+                kept.append((tuple(box), char, score))
+
+    context = max(overlap, CONTEXT)
+    for merged in _merge_boxes(cut):
+        window = (max(merged[0] - context, 0), max(merged[1] - context, 0),
+                  min(merged[2] + context, shape[0]), min(merged[3] + context, shape[1]))
+        boxes = [box for box, _, _ in kept]
+        coordinates, chars, scores, _ = _recognize_window(image, window, model_filename2, model_filename36, working_size,
+                                                          instruments, threshold)
+        for box, char, score in zip(coordinates, chars, scores):
+            centre = ((box[0] + box[2]) // 2, (box[1] + box[3]) // 2)
+            inside = merged[0] <= centre[0] < merged[2] and merged[1] <= centre[1] < merged[3]
+            if inside and not _overlaps(box, boxes):
+                kept.append((tuple(box), char, score))
+
+    if clear_border:
+        kept = [result for result in kept if min(result[0][:2]) > 0 and result[0][2] < shape[0] and result[0][3] < shape[1]]
+    kept.sort(key=lambda result: result[0])
+    return {
+           'coordinates': np.array([box for box, _, _ in kept], dtype=int).reshape((-1, 4)),
+           'predicted_char': np.array([char for _, char, _ in kept], dtype=str),
+           'score': np.array([score for _, _, score in kept]),
+           }
@@ -1,28 +1,59 @@
 import numpy as np
-from skimage.io import imread
+from scipy import ndimage
 from skimage.filter import threshold_otsu
-from skimage.transform import resize
-import cPickle
-from matplotlib import pyplot as plt
+from skimage.transform import resize, pyramid_reduce
+from resample import resize_batch
+import dataset
 from skimage.morphology import closing, square
-from skimage.measure import regionprops
 from skimage import restoration
 from skimage import measure
-from skimage.color import label2rgb
-import matplotlib.patches as mpatches
+from skimage.color import rgb2gray
+import instrument
+from models import load_model, hog_step, hog_params, predict_from_hog, decision_from_hog, confidence
+
+# skimage.io (which imports matplotlib) is only imported to read an image file, matplotlib and label2rgb
+# only by the plotting methods, so that a headless process running the OCR stages never loads them.
 
 class UserData():
     """
     class in charge of dealing with User Image input.
     the methods provided are finalized to process the image and return 
     the text contained in it.
+    When the text/no-text model and the character model compute the same HOG features
+    (same hog_params) the features are computed once and shared by the two models, unless share_hog is False.
+    Every stage is measured by instruments, if given (an instrument.Instruments).
     """
     
-    def __init__(self, image_file):
+    def __init__(self, image_file, verbose=True, working_size=None, share_hog=True, clear_border=False,
+                 instruments=None, storage_dtype='float64', threshold=None):
         """
         reads the image provided by the user as grey scale and preprocesses it.
+        image_file is either the path to the image or the image itself as a numpy array.
+        If working_size is given and the image is bigger, denoising, thresholding and object
+        detection run on the image downscaled so that its longest side is working_size pixels,
+        while the candidates are still cropped from the full resolution image.
+        With share_hog False the character model always computes its own HOG features.
+        With clear_border, objects touching the sides of the image are not candidates.
+        The candidates are stored as storage_dtype (float32 halves them, see dataset.storage_dtype), the
+        shipped models were trained on float64 crops.
+        If threshold is given the denoised image is binarized with it instead of its Otsu threshold
+        (tiles.tiled_text binarizes every tile with the threshold of the whole image).
         """
-        self.image = imread(image_file, as_grey=True)
+        self.verbose = verbose
+        self.working_size = working_size
+        self.share_hog = share_hog
+        self.clear_border = clear_border
+        self.instruments = instruments
+        self.threshold = threshold
+        self.storage_dtype = dataset.storage_dtype(np.dtype(storage_dtype).name)
+        self.shared_hog = None
+        with instrument.stage(self.instruments, 'load') as stage:
+            if isinstance(image_file, np.ndarray):
+                self.image = rgb2gray(image_file) if image_file.ndim == 3 else image_file
+            else:
+                from skimage.io import imread
+                self.image = imread(image_file, as_grey=True)
+            stage.done(self.image.size, self.image.nbytes)
         self.preprocess_image()
     
 #############################################################################################################
@@ -30,12 +61,22 @@ class UserData():
     def preprocess_image(self):
         """
         Denoises and increases contrast. 
+        bw is at the working resolution, self.scale holds the (rows, columns) factors mapping
+        it back to self.image. The denoised image is released as soon as it is thresholded.
         """
-        image = restoration.denoise_tv_chambolle(self.image, weight=0.1)
-        thresh = threshold_otsu(image)
-        self.bw = closing(image > thresh, square(2))
-        self.cleared = self.bw.copy()
-        return self.cleared 
+        with instrument.stage(self.instruments, 'denoise') as stage:
+            image = self.image
+            if self.working_size is not None and max(image.shape) > self.working_size:
+                image = pyramid_reduce(image, downscale=float(max(image.shape)) / self.working_size)
+            self.scale = (float(self.image.shape[0]) / image.shape[0], float(self.image.shape[1]) / image.shape[1])
+            image = restoration.denoise_tv_chambolle(image, weight=0.1)
+            stage.done(image.size, image.nbytes)
+        with instrument.stage(self.instruments, 'threshold') as stage:
+            thresh = threshold_otsu(image) if self.threshold is None else self.threshold
+            image = image > thresh
+            self.bw = closing(image, square(2))
+            stage.done(self.bw.size, self.bw.nbytes)
+        return self.bw
     
 ############################################################################################################
 
@@ -43,49 +84,55 @@ class UserData():
         """
         identifies objects in the image. Gets contours, draws rectangles around them
         and saves the rectangles as individual images.
+        Areas and bounding boxes of all the labels are computed at once (bincount and find_objects)
+        and filtered with array masks; the rectangles are the bounding boxes grown by a margin
+        clipped to the image bounds.
+        With clear_border the labels found on the sides of the image are dropped with the small ones.
+        With a working_size the boxes found on the downscaled image are mapped back (and the area
+        filter is applied) at full resolution.
         """
-        label_image = measure.label(self.cleared)   
-        borders = np.logical_xor(self.bw, self.cleared)
-        label_image[borders] = -1
-        
-        
-        coordinates = []
-        i=0
-        
-        for region in regionprops(label_image):
-            if region.area > 10:
-                minr, minc, maxr, maxc = region.bbox
-                margin = 3
-                minr, minc, maxr, maxc = minr-margin, minc-margin, maxr+margin, maxc+margin
-                roi = self.image[minr:maxr, minc:maxc]
-                if roi.shape[0]*roi.shape[1] == 0:
-                    continue
-                else:
-                    if i==0:
-                        samples = resize(roi, (20,20))
-                        coordinates.append(region.bbox)
-                        i+=1
-                    elif i==1:
-                        roismall = resize(roi, (20,20))
-                        samples = np.concatenate((samples[None,:,:], roismall[None,:,:]), axis=0)
-                        coordinates.append(region.bbox)
-                        i+=1
-                    else:
-                        roismall = resize(roi, (20,20))
-                        samples = np.concatenate((samples[:,:,:], roismall[None,:,:]), axis=0)
-                        coordinates.append(region.bbox)
+        margin = 3
+        with instrument.stage(self.instruments, 'label') as stage:
+            label_image = measure.label(self.bw)
+            stage_bytes = label_image.nbytes
+            # as with regionprops, label 0 is not an object
+            areas = np.bincount(label_image.ravel())[1:]
+            boxes = np.array([(box[0].start, box[1].start, box[0].stop, box[1].stop) if box is not None else (0, 0, 0, 0)
+                              for box in ndimage.find_objects(label_image)], dtype=int).reshape((-1, 4))
+            rows, cols = self.scale
+            keep = areas * rows * cols > 10
+            if self.clear_border:
+                sides = np.concatenate((label_image[0], label_image[-1], label_image[:, 0], label_image[:, -1]))
+                keep[np.unique(sides[sides > 0]) - 1] = False
+            del label_image
+            coordinates = boxes[keep]
+            shape = self.image.shape
+            if self.scale != (1.0, 1.0):
+                coordinates = np.hstack((np.floor(coordinates[:, :2] * [rows, cols]),
+                                         np.ceil(coordinates[:, 2:] * [rows, cols]))).astype(int)
+                coordinates = np.minimum(coordinates, [shape[0], shape[1], shape[0], shape[1]])
+            rois = np.clip(coordinates + [-margin, -margin, margin, margin], 0, [shape[0], shape[1], shape[0], shape[1]])
+            stage.done(boxes.shape[0], stage_bytes + boxes.nbytes)
+        
+        with instrument.stage(self.instruments, 'crop_resize') as stage:
+            # the crops are views on self.image, resized together (the crops of the same shape at once)
+            # straight into the stack
+            crops = [self.image[minr:maxr, minc:maxc] for minr, minc, maxr, maxc in rois]
+            samples = resize_batch(crops, (20,20), dtype=self.storage_dtype)
+            stage.done(samples.shape[0], samples.nbytes)
         
         self.candidates = {
                     'fullscale': samples,          
-                    'flattened': samples.reshape((samples.shape[0], -1)),
-                    'coordinates': np.array(coordinates)
+                    'flattened': samples.reshape((samples.shape[0], samples.shape[1] * samples.shape[2])),
+                    'coordinates': coordinates
                     }
         
-        print 'Images After Contour Detection'
-        print 'Fullscale: ', self.candidates['fullscale'].shape
-        print 'Flattened: ', self.candidates['flattened'].shape
-        print 'Contour Coordinates: ', self.candidates['coordinates'].shape
-        print '============================================================'
+        if self.verbose:
+            print 'Images After Contour Detection'
+            print 'Fullscale: ', self.candidates['fullscale'].shape
+            print 'Flattened: ', self.candidates['flattened'].shape
+            print 'Contour Coordinates: ', self.candidates['coordinates'].shape
+            print '============================================================'
         
         return self.candidates 
     
@@ -96,10 +143,25 @@ class UserData():
         it takes as argument a pickle model and predicts whether the detected objects
         contain text or not. 
         """
-        with open(model_filename2, 'rb') as fin:
-            model = cPickle.load(fin)
+        model = load_model(model_filename2)
+        hog = hog_step(model)
             
-        is_text = model.predict(self.candidates['flattened'])
+        if self.candidates['flattened'].shape[0] == 0:
+            is_text = np.array([], dtype=str)
+        elif hog is not None:
+            with instrument.stage(self.instruments, 'hog') as stage:
+                features = hog.transform(self.candidates['flattened'])
+                stage.done(features.shape[0], features.nbytes)
+            with instrument.stage(self.instruments, 'text_filter') as stage:
+                is_text = predict_from_hog(model, features)
+                stage.done(is_text.shape[0], is_text.nbytes)
+            if self.share_hog:
+                # kept for classify_text, which reuses them if its model has the same HOG step
+                self.shared_hog = (hog_params(hog), features[is_text == '1'])
+        else:
+            with instrument.stage(self.instruments, 'text_filter') as stage:
+                is_text = model.predict(dataset.as_float(self.candidates['flattened']))
+                stage.done(is_text.shape[0], is_text.nbytes)
         
         self.to_be_classified = {
                                  'fullscale': self.candidates['fullscale'][is_text == '1'],
@@ -107,12 +169,13 @@ class UserData():
                                  'coordinates': self.candidates['coordinates'][is_text == '1']
                                  }
 
-        print 'Images After Text Detection'
-        print 'Fullscale: ', self.to_be_classified['fullscale'].shape
-        print 'Flattened: ', self.to_be_classified['flattened'].shape
-        print 'Contour Coordinates: ', self.to_be_classified['coordinates'].shape
-        print 'Rectangles Identified as NOT containing Text '+str(self.candidates['coordinates'].shape[0]-self.to_be_classified['coordinates'].shape[0])+' out of '+str(self.candidates['coordinates'].shape[0])
-        print '============================================================'
+        if self.verbose:
+            print 'Images After Text Detection'
+            print 'Fullscale: ', self.to_be_classified['fullscale'].shape
+            print 'Flattened: ', self.to_be_classified['flattened'].shape
+            print 'Contour Coordinates: ', self.to_be_classified['coordinates'].shape
+            print 'Rectangles Identified as NOT containing Text '+str(self.candidates['coordinates'].shape[0]-self.to_be_classified['coordinates'].shape[0])+' out of '+str(self.candidates['coordinates'].shape[0])
+            print '============================================================'
         
                
         return self.to_be_classified
@@ -121,18 +184,40 @@ class UserData():
 
     def classify_text(self, model_filename36):
         """
-        it takes as argument a pickle model and predicts character
+        it takes as argument a pickle model and predicts character.
+        Next to each character it returns its score (see models.confidence).
         """
-        with open(model_filename36, 'rb') as fin:
-            model = cPickle.load(fin)
+        model = load_model(model_filename36)
+        hog = hog_step(model)
             
-        which_text = model.predict(self.to_be_classified['flattened'])
+        if self.to_be_classified['flattened'].shape[0] == 0:
+            which_text = np.array([], dtype=str)
+            score = np.array([])
+        elif hog is not None:
+            if self.share_hog and self.shared_hog is not None and self.shared_hog[0] == hog_params(hog):
+                features = self.shared_hog[1]
+            else:
+                with instrument.stage(self.instruments, 'hog') as stage:
+                    features = hog.transform(self.to_be_classified['flattened'])
+                    stage.done(features.shape[0], features.nbytes)
+            with instrument.stage(self.instruments, 'classify') as stage:
+                which_text = predict_from_hog(model, features)
+                score = confidence(decision_from_hog(model, features))
+                stage.done(which_text.shape[0], which_text.nbytes + score.nbytes)
+        else:
+            with instrument.stage(self.instruments, 'classify') as stage:
+                flattened = dataset.as_float(self.to_be_classified['flattened'])
+                which_text = model.predict(flattened)
+                score = confidence(model.decision_function(flattened))
+                stage.done(which_text.shape[0], which_text.nbytes + score.nbytes)
+        self.shared_hog = None
         
         self.which_text = {
                                  'fullscale': self.to_be_classified['fullscale'],
                                  'flattened': self.to_be_classified['flattened'],
                                  'coordinates': self.to_be_classified['coordinates'],
-                                 'predicted_char': which_text
+                                 'predicted_char': which_text,
+                                 'score': score
                                  }     
 
         return self.which_text
@@ -144,6 +229,8 @@ class UserData():
         processes the classified characters and reorders them in a 2D space 
         generating a matplotlib image. 
         """
+        from matplotlib import pyplot as plt
+
         max_maxrow = max(self.which_text['coordinates'][:,2])
         min_mincol = min(self.which_text['coordinates'][:,1])
         subtract_max = np.array([max_maxrow, min_mincol, max_maxrow, min_mincol]) 
@@ -186,6 +273,8 @@ class UserData():
         plots images at several steps of the whole pipeline, just to check output.
         what_to_plot is the name of the dictionary to be plotted
         """
+        from matplotlib import pyplot as plt
+
         n_images = what_to_plot['fullscale'].shape[0]
         
         fig = plt.figure(figsize=(12, 12))
@@ -218,28 +307,23 @@ class UserData():
     def plot_preprocessed_image(self):
         """
         plots pre-processed image. The plotted image is the same as obtained at the end
-        of the get_text_candidates method.
+        of the get_text_candidates method: the labels of bw, at the working resolution, and the
+        rectangles of the candidates.
         """
-        image = restoration.denoise_tv_chambolle(self.image, weight=0.1)
-        thresh = threshold_otsu(image)
-        bw = closing(image > thresh, square(2))
-        cleared = bw.copy()
-        
-        label_image = measure.label(cleared)
-        borders = np.logical_xor(bw, cleared)
-       
-        label_image[borders] = -1
-        image_label_overlay = label2rgb(label_image, image=image)
+        from matplotlib import pyplot as plt
+        import matplotlib.patches as mpatches
+        from skimage.color import label2rgb
+
+        image = self.image if self.scale == (1.0, 1.0) else resize(self.image, self.bw.shape)
+        image_label_overlay = label2rgb(measure.label(self.bw), image=image)
         
         fig, ax = plt.subplots(ncols=1, nrows=1, figsize=(12, 12))
         ax.imshow(image_label_overlay)
         
-        for region in regionprops(label_image):
-            if region.area < 10:
-                continue
-        
-            minr, minc, maxr, maxc = region.bbox
-            rect = mpatches.Rectangle((minc, minr), maxc - minc, maxr - minr,
+        candidates = self.candidates if hasattr(self, 'candidates') else self.get_text_candidates()
+        rows, cols = self.scale
+        for minr, minc, maxr, maxc in candidates['coordinates']:
+            rect = mpatches.Rectangle((minc / cols, minr / rows), (maxc - minc) / cols, (maxr - minr) / rows,
                                       fill=False, edgecolor='red', linewidth=2)
             ax.add_patch(rect)
         